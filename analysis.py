@@ -0,0 +1,94 @@
+import base64
+import time
+import chess
+import board_vision
+import recognition_cache
+import analysis_cache
+import render
+import White_Best_Move
+import Black_Best_Move
+import hints
+
+SIDES = {'white': chess.WHITE, 'black': chess.BLACK}
+MODES = ('best_move', 'hint')
+# Each side keeps recognizing boards with its own module's models
+RECOGNIZERS = {chess.WHITE: White_Best_Move, chess.BLACK: Black_Best_Move}
+
+
+def _elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def square_labels(labels):
+    """recognize_squares() labels as JSON-ready dicts keyed by square name"""
+    return [
+        {
+            'square': chess.square_name(chess.square(i % 8, 7 - i // 8)),
+            'color': color,
+            'color_confidence': color_confidence,
+            'piece': piece,
+            'piece_confidence': piece_confidence,
+        }
+        for i, color, color_confidence, piece, piece_confidence in labels
+    ]
+
+
+def analyze(image, side='white', mode='best_move', limits=None, results_folder=None, render_format=None):
+    """
+    Recognize a board image and search it for `side`. Returns a JSON-ready
+    dict with the FEN, per-square labels and confidences, best move, score
+    (centipawns for the side to move), PV and a per-stage timing breakdown in
+    milliseconds. In 'hint' mode it also carries the hint text. The
+    before/after image is only rendered when `render_format` ('png', 'jpeg'
+    or 'webp') is given, and is returned base64-encoded under 'image'.
+    """
+    if side not in SIDES:
+        raise ValueError(f"Unknown side: {side} (expected 'white' or 'black')")
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode: {mode} (expected 'best_move' or 'hint')")
+    turn = SIDES[side]
+    module = RECOGNIZERS[turn]
+    timings = {}
+    started = time.perf_counter()
+
+    start = time.perf_counter()
+    img = board_vision.load_image(image)
+    timings['decode_ms'] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    labels = recognition_cache.recognize(module.preprocess_input_image(img), module.recognize_squares)
+    fen = f"{recognition_cache.placement_fen(labels)} {'w' if turn == chess.WHITE else 'b'} KQkq - 0 1"
+    board = chess.Board(fen)
+    timings['recognition_ms'] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    result = analysis_cache.best_move(board, limits, results_folder)
+    timings['search_ms'] = _elapsed_ms(start)
+
+    move = result['move']
+    response = {
+        'fen': fen,
+        'side': side,
+        'mode': mode,
+        'squares': square_labels(labels),
+        'move': move.uci() if move else None,
+        'san': board.san(move) if move else None,
+        'score': result['score'],
+        'pv': [m.uci() for m in result['pv']],
+        'depth': result['depth'],
+        'nodes': result['nodes'] + result['qnodes'],
+        'cached': result.get('cached', False),
+    }
+    if mode == 'hint':
+        response['hint'] = hints.hint_from_result(board, result)
+
+    if render_format and move:
+        start = time.perf_counter()
+        updated_img = module.apply_move_to_image(img.copy(), move)
+        image_bytes = render.render_comparison(img, updated_img, move, fmt=render_format)
+        response['image'] = {'format': render_format, 'data': base64.b64encode(image_bytes).decode('ascii')}
+        timings['render_ms'] = _elapsed_ms(start)
+
+    timings['total_ms'] = _elapsed_ms(started)
+    response['timings'] = timings
+    return response
@@ -0,0 +1,154 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import chess
+import search_engine
+
+# Persistent cache of engine results, one SQLite file per results folder.
+# Entries are keyed by the engine version and the position (FEN without the
+# move clocks) and remember the depth their search completed; an entry only
+# answers requests for that depth or less. The least recently used entries
+# are dropped once the file holds more than max_entries results.
+CACHE_FILENAME = 'analysis_cache.sqlite3'
+DEFAULT_FOLDER = os.environ.get('CHESS_RESULTS_FOLDER', 'results')
+MAX_ENTRIES = int(os.environ.get('CHESS_ANALYSIS_CACHE_SIZE', 10000))
+
+log = logging.getLogger(__name__)
+
+
+def position_key(board):
+    """Cache key: engine version, board, side to move, castling and en passant"""
+    return f"{search_engine.ENGINE_VERSION}|{board.epd()}"
+
+
+def requested_depth(limits=None):
+    """The depth a search with these limits aims for, which a cached entry must reach"""
+    limits = limits or {}
+    return search_engine.search_depth(limits.get('depth'), limits.get('time_ms'), limits.get('nodes'))
+
+
+class AnalysisCache:
+    def __init__(self, path, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS analysis ('
+            'key TEXT PRIMARY KEY, move TEXT, score INTEGER, pv TEXT, depth INTEGER, '
+            'hits INTEGER NOT NULL DEFAULT 0, last_used REAL NOT NULL)'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS analysis_last_used ON analysis (last_used)')
+
+    def get(self, board, limits=None):
+        """The stored result for this position if it was searched at least as deep as `limits` ask, or None"""
+        key = position_key(board)
+        try:
+            with self.lock:
+                row = self.connection.execute(
+                    'SELECT move, score, pv, depth FROM analysis WHERE key = ? AND depth >= ?',
+                    (key, requested_depth(limits))
+                ).fetchone()
+                if row is not None:
+                    self.connection.execute(
+                        'UPDATE analysis SET hits = hits + 1, last_used = ? WHERE key = ?', (time.time(), key)
+                    )
+        except sqlite3.Error as e:
+            log.warning("Analysis cache read failed: %s", e)
+            row = None
+
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        move, score, pv, depth = row
+        return {
+            'move': chess.Move.from_uci(move) if move else None,
+            'score': score,
+            'pv': [chess.Move.from_uci(uci) for uci in pv.split()],
+            'depth': depth,
+        }
+
+    def put(self, board, result):
+        """Store `result` unless the position already has an entry searched as deep or deeper"""
+        move = result['move']
+        pv = ' '.join(m.uci() for m in result['pv'])
+        try:
+            with self.lock:
+                self.connection.execute(
+                    'INSERT INTO analysis (key, move, score, pv, depth, last_used) VALUES (?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (key) DO UPDATE SET move = excluded.move, score = excluded.score, '
+                    'pv = excluded.pv, depth = excluded.depth, last_used = excluded.last_used '
+                    'WHERE excluded.depth > analysis.depth',
+                    (position_key(board), move.uci() if move else None, result['score'], pv,
+                     result['depth'], time.time())
+                )
+                self.connection.execute(
+                    'DELETE FROM analysis WHERE key IN '
+                    '(SELECT key FROM analysis ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                )
+        except sqlite3.Error as e:
+            log.warning("Analysis cache write failed: %s", e)
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute('DELETE FROM analysis')
+        self.hits = self.misses = 0
+
+    def stats(self):
+        with self.lock:
+            entries, stored_hits = self.connection.execute(
+                'SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM analysis'
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries,
+            'stored_hits': stored_hits,
+        }
+
+
+_caches = {}
+_lock = threading.Lock()
+
+
+def get_cache(folder=None):
+    """The cache stored in `folder` (DEFAULT_FOLDER if None), opened once per process"""
+    path = os.path.abspath(os.path.join(folder or DEFAULT_FOLDER, CACHE_FILENAME))
+    with _lock:
+        cache = _caches.get(path)
+        if cache is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            cache = AnalysisCache(path)
+            _caches[path] = cache
+    return cache
+
+
+def best_move(board, limits=None, folder=None):
+    """
+    search_engine.best_move() that looks in the cache first and stores what
+    it searches. A search cut short by its budget is stored with the depth it
+    completed, so it never answers a later request for more. Cached results
+    carry 'cached': True and no node counts.
+    """
+    cache = get_cache(folder)
+    start = time.perf_counter()
+    result = cache.get(board, limits)
+    if result is not None:
+        result.update(nodes=0, qnodes=0, time_ms=(time.perf_counter() - start) * 1000, cached=True)
+        return result
+
+    result = search_engine.best_move(board, limits)
+    # A search with no move (none legal, or no iteration finished) is not worth keeping
+    if result['move'] is not None:
+        cache.put(board, result)
+    result['cached'] = False
+    return result
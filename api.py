@@ -0,0 +1,163 @@
+import base64
+import binascii
+from flask import Blueprint, current_app, jsonify, request, url_for
+import analysis
+import analysis_cache
+import board_vision
+import job_queue
+import model_registry
+import recognition_cache
+import search_engine
+
+# JSON counterpart of the HTML routes, registered by app.py and new.py.
+# POST /api/analyze takes the image as a multipart 'file' or as base64 in a
+# JSON 'image' field (a data URI works too), plus optional 'side', 'mode',
+# 'depth', 'time_ms', 'nodes', 'render' and 'format'. POST /api/jobs takes the
+# same request but queues it and returns a job id to poll at /api/jobs/<id>.
+# GET /api/jobs/metrics, /api/inference/metrics and /api/cache/metrics report
+# queue, batching and cache counters.
+api = Blueprint('api', __name__, url_prefix='/api')
+
+
+def request_params():
+    """Form fields for multipart requests, the JSON body otherwise"""
+    if request.files or request.form:
+        return request.form
+    params = request.get_json(silent=True)
+    if params is None:
+        return {}
+    if not isinstance(params, dict):
+        raise ValueError("The JSON body must be an object")
+    return params
+
+
+def text(params, name, default):
+    value = params.get(name, default)
+    if not isinstance(value, str):
+        raise ValueError(f"The '{name}' field must be a string")
+    return value
+
+
+def read_image(params):
+    if 'file' in request.files:
+        data = request.files['file'].read()
+    else:
+        encoded = text(params, 'image', '')
+        if not encoded:
+            raise ValueError("No image provided: send a 'file' upload or a base64 'image' field")
+        if encoded.startswith('data:'):
+            encoded = encoded.split(',', 1)[-1]
+        try:
+            data = base64.b64decode(encoded, validate=True)
+        except binascii.Error:
+            raise ValueError("The 'image' field is not valid base64")
+    if not data:
+        raise ValueError("The uploaded image is empty")
+    return data
+
+
+def request_limits(params):
+    """
+    Search limits from the request. The search runs inline, so the app's
+    SEARCH_DEPTH and SEARCH_TIME_MS are ceilings as well as defaults.
+    """
+    config = current_app.config
+
+    def integer(name):
+        value = params.get(name)
+        if value in (None, ''):
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"The '{name}' field must be an integer")
+
+    limits = search_engine.capped_limits(integer('depth'), integer('time_ms'),
+                                         config.get('SEARCH_DEPTH'), config.get('SEARCH_TIME_MS'))
+    limits['workers'] = config.get('SEARCH_WORKERS', 1)
+    nodes = integer('nodes')
+    if nodes:
+        limits['nodes'] = nodes
+    return limits
+
+
+def flag(value):
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+def analysis_args(params):
+    """analysis.analyze() keyword arguments for this request"""
+    side = text(params, 'side', 'white').lower()
+    mode = text(params, 'mode', 'best_move').lower()
+    # Checked here too so queued jobs are refused up front rather than failing later
+    if side not in analysis.SIDES:
+        raise ValueError(f"Unknown side: {side} (expected 'white' or 'black')")
+    if mode not in analysis.MODES:
+        raise ValueError(f"Unknown mode: {mode} (expected 'best_move' or 'hint')")
+    return {
+        'side': side,
+        'mode': mode,
+        'limits': request_limits(params),
+        'results_folder': current_app.config.get('RESULTS_FOLDER'),
+        'render_format': text(params, 'format', 'png').lower() if flag(params.get('render', False)) else None,
+    }
+
+
+def jobs():
+    config = current_app.config
+    return job_queue.default_queue(config.get('JOB_WORKERS'), config.get('JOB_QUEUE_DEPTH'),
+                                   config.get('JOB_TIMEOUT_S'))
+
+
+@api.route('/analyze', methods=['POST'])
+def analyze():
+    try:
+        params = request_params()
+        result = analysis.analyze(read_image(params), **analysis_args(params))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    except Exception as e:
+        current_app.logger.exception("Analysis request failed")
+        return jsonify(error=f"An error occurred: {str(e)}"), 500
+    return jsonify(result)
+
+
+@api.route('/jobs', methods=['POST'])
+def submit_job():
+    try:
+        params = request_params()
+        job_id = jobs().submit(read_image(params), **analysis_args(params))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    except job_queue.QueueFull as e:
+        return jsonify(error=str(e)), 503, {'Retry-After': '1'}
+    return jsonify(id=job_id, status=job_queue.QUEUED), 202, {'Location': url_for('api.job_status', job_id=job_id)}
+
+
+@api.route('/jobs/<job_id>')
+def job_status(job_id):
+    status = jobs().status(job_id)
+    if status is None:
+        return jsonify(error=f"Unknown job: {job_id}"), 404
+    return jsonify(status)
+
+
+@api.route('/jobs/metrics')
+def job_metrics():
+    return jsonify(jobs().metrics())
+
+
+@api.route('/inference/metrics')
+def inference_metrics():
+    # Batch-size distribution of the micro-batched models in this process
+    return jsonify(model_registry.batching_stats())
+
+
+@api.route('/cache/metrics')
+def cache_metrics():
+    # Hit counters of this process's caches; /api/jobs workers keep their own
+    return jsonify(
+        crops=board_vision.piece_crop_cache.stats(),
+        recognition=recognition_cache.default_cache.stats(),
+        analysis=analysis_cache.get_cache(current_app.config.get('RESULTS_FOLDER')).stats(),
+    )
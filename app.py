@@ -2,20 +2,55 @@ from flask import Flask, request, render_template, send_from_directory, url_for
 import os
 from White_Best_Move import process_and_move as process_white_move
 from Black_Best_Move import process_and_move as process_black_move
+import White_Best_Move
+import Black_Best_Move
+import model_registry
+import search_engine
+import debug
+from api import api
 
 # Initialize the Flask app and specify the template folder
 app = Flask(__name__, template_folder=r"D:\Projects\Machine_learning\website\template")
 
-# Paths to save uploaded images and results
-UPLOAD_FOLDER = r"D:\Projects\Machine_learning\website\uploads"
+# Path to save result images; uploads are processed in memory
 RESULTS_FOLDER = r"D:\Projects\Machine_learning\website\results"
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['RESULTS_FOLDER'] = RESULTS_FOLDER
 
-# Ensure that the results and upload directories exist
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Search limits: the search deepens up to SEARCH_DEPTH but stops after
+# SEARCH_TIME_MS so slow boards can't hold a worker past its timeout.
+# Requests may ask for less of either, never more.
+app.config['SEARCH_DEPTH'] = int(os.environ.get('SEARCH_DEPTH', 4))
+app.config['SEARCH_TIME_MS'] = int(os.environ.get('SEARCH_TIME_MS', 5000))
+# Processes to split each search across (0 = every core, 1 = in-process).
+# The pool serves one search at a time; concurrent requests wait their turn.
+app.config['SEARCH_WORKERS'] = int(os.environ.get('SEARCH_WORKERS', 1))
+# Background analyses (/api/jobs): warm worker processes, how many jobs may
+# wait or run at once before new ones are refused, and the per-job timeout
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))
+app.config['JOB_QUEUE_DEPTH'] = int(os.environ.get('JOB_QUEUE_DEPTH', 32))
+app.config['JOB_TIMEOUT_S'] = float(os.environ.get('JOB_TIMEOUT_S', 60))
+
+# Ensure that the results directory exists
 os.makedirs(RESULTS_FOLDER, exist_ok=True)
 
+# JSON analysis API under /api
+app.register_blueprint(api)
+
+# Search and job worker processes are spawned, so they re-import this script
+# as __mp_main__; only the server process sets up logging and loads the models
+if __name__ != '__mp_main__':
+    # Warnings only unless CHESS_DEBUG asks for the diagnostic logs and images
+    debug.configure_logging()
+    # Load the classification models once at startup instead of on the first request
+    model_registry.warm_up(White_Best_Move.MODEL_PATHS + Black_Best_Move.MODEL_PATHS)
+
+def search_limits():
+    """Engine limits for this request: the form may ask for less than SEARCH_DEPTH/SEARCH_TIME_MS, never more"""
+    limits = search_engine.capped_limits(request.form.get('depth', type=int), request.form.get('time_ms', type=int),
+                                         app.config['SEARCH_DEPTH'], app.config['SEARCH_TIME_MS'])
+    limits['workers'] = app.config['SEARCH_WORKERS']
+    return limits
+
 def allowed_file(filename):
     """Check if the uploaded file has an allowed extension"""
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
@@ -38,13 +73,13 @@ def run_white():
         return render_template('front.html', error="Invalid file type. Please upload a PNG or JPG image.")
     
     try:
-        # Generate a unique filename to prevent overwrites
-        filename = f"upload_{os.path.splitext(file.filename)[0]}_{os.urandom(4).hex()}.png"
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+        # Keep the upload in memory; the pipeline decodes the bytes once
+        image_bytes = file.read()
+        # Unique name for the result image to prevent overwrites
+        name = f"upload_{os.path.splitext(file.filename)[0]}_{os.urandom(4).hex()}"
         
         # Process the image
-        best_move, result_image_filename = process_white_move(file_path, app.config['RESULTS_FOLDER'])
+        best_move, result_image_filename = process_white_move(image_bytes, app.config['RESULTS_FOLDER'], search_limits(), name)
         
         if best_move and result_image_filename:
             # Generate the URL for the result image
@@ -59,10 +94,6 @@ def run_white():
     except Exception as e:
         return render_template('front.html',
                             error=f"An error occurred: {str(e)}")
-    finally:
-        # Clean up uploaded file
-        if os.path.exists(file_path):
-            os.remove(file_path)
 
 @app.route('/run_black', methods=['POST'])
 def run_black():
@@ -77,13 +108,13 @@ def run_black():
         return render_template('front.html', error="Invalid file type. Please upload a PNG or JPG image.")
     
     try:
-        # Generate a unique filename to prevent overwrites
-        filename = f"upload_{os.path.splitext(file.filename)[0]}_{os.urandom(4).hex()}.png"
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+        # Keep the upload in memory; the pipeline decodes the bytes once
+        image_bytes = file.read()
+        # Unique name for the result image to prevent overwrites
+        name = f"upload_{os.path.splitext(file.filename)[0]}_{os.urandom(4).hex()}"
         
         # Process the image
-        best_move, result_image_filename = process_black_move(file_path, app.config['RESULTS_FOLDER'])
+        best_move, result_image_filename = process_black_move(image_bytes, app.config['RESULTS_FOLDER'], search_limits(), name)
         
         if best_move and result_image_filename:
             # Generate the URL for the result image
@@ -98,10 +129,6 @@ def run_black():
     except Exception as e:
         return render_template('front.html',
                             error=f"An error occurred: {str(e)}")
-    finally:
-        # Clean up uploaded file
-        if os.path.exists(file_path):
-            os.remove(file_path)
 
 @app.route('/results/<filename>')
 def send_result(filename):
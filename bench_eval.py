@@ -0,0 +1,69 @@
+import random
+import sys
+import time
+import chess
+import search_engine
+from bench_search import POSITIONS
+
+
+def recount_material(board):
+    # The leaf evaluation the search used before: twelve piece-set scans
+    material_values = {
+        chess.PAWN: 100, chess.KNIGHT: 300, chess.BISHOP: 300,
+        chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 0
+    }
+    score = 0
+    for piece_type, value in material_values.items():
+        score += len(board.pieces(piece_type, chess.WHITE)) * value
+        score -= len(board.pieces(piece_type, chess.BLACK)) * value
+    return score if board.turn == chess.WHITE else -score
+
+
+def sample_leaves(count, seed=0):
+    """(board, move) pairs from short random games out of the search suite"""
+    rng = random.Random(seed)
+    leaves = []
+    fens = list(POSITIONS.values())
+    while len(leaves) < count:
+        board = chess.Board(rng.choice(fens))
+        for _ in range(rng.randint(0, 12)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        moves = list(board.legal_moves)
+        if moves:
+            leaves.append((board, rng.choice(moves)))
+    return leaves
+
+
+def run(count):
+    leaves = sample_leaves(count)
+    boards = [board for board, _ in leaves]
+
+    start = time.perf_counter()
+    for board in boards:
+        recount_material(board)
+    recount_rate = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for board in boards:
+        search_engine.evaluate(board)
+    full_rate = count / (time.perf_counter() - start)
+
+    # What the search pays per leaf now: one move delta on push, then a lookup
+    searcher = search_engine.Searcher()
+    start = time.perf_counter()
+    for board, move in leaves:
+        searcher.score = search_engine.move_delta(board, move)
+        searcher.evaluate(board)
+    incremental_rate = count / (time.perf_counter() - start)
+
+    print(f"{count} leaves")
+    print(f"  {'material recount':<24} {recount_rate:>12,.0f} evals/s")
+    print(f"  {'full material + PST':<24} {full_rate:>12,.0f} evals/s")
+    print(f"  {'incremental':<24} {incremental_rate:>12,.0f} evals/s")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,70 @@
+import sys
+import time
+import chess
+import search_engine
+
+# Fixed position suite for comparing search changes by node count
+POSITIONS = {
+    "Italian, black to move": "r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3",
+    "Kiwipete": "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "Queen's Gambit middlegame": "r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP1B1PPP/R2QKB1R w KQ - 0 8",
+    "five.png": "1b1b2K1/1r6/2P4p/1b1p4/4N1k1/3B2Q1/2q5/2N2q2 w - - 0 1",
+}
+
+# Name -> Searcher keyword arguments
+CONFIGURATIONS = {
+    "hash move only": {"move_ordering": False, "narrow_root": False, "pvs": False, "aspiration": False, "quiescence": False},
+    "full-window root": {"narrow_root": False, "pvs": False, "aspiration": False, "quiescence": False},
+    "narrowed root": {"pvs": False, "aspiration": False, "quiescence": False},
+    "PVS + aspiration": {"quiescence": False},
+    "+ quiescence": {},
+}
+
+
+def run(depth):
+    totals = {name: 0 for name in CONFIGURATIONS}
+    for position, fen in POSITIONS.items():
+        print(position)
+        for name, options in CONFIGURATIONS.items():
+            searcher = search_engine.Searcher(search_engine.TranspositionTable(), **options)
+            start = time.perf_counter()
+            move, score = searcher.search(chess.Board(fen), depth)
+            elapsed = time.perf_counter() - start
+            nodes = searcher.nodes + searcher.qnodes
+            totals[name] += nodes
+            print(f"  {name:<20} {nodes:>10} nodes {elapsed:8.2f}s  {move} ({score})")
+
+    print("Total nodes")
+    for name, nodes in totals.items():
+        print(f"  {name:<20} {nodes:>10}")
+
+
+def move_value(board, move, depth):
+    """Score of `move` by a reference search one ply deeper than the comparison"""
+    board = board.copy()
+    board.push(move)
+    searcher = search_engine.Searcher(search_engine.TranspositionTable())
+    _, score = searcher.search(board, depth)
+    return -score
+
+
+def compare_quiescence(depth):
+    """A plain depth-`depth` search against depth - 1 plus quiescence"""
+    print(f"Depth {depth} vs depth {depth - 1} + quiescence (moves scored by a depth {depth} + quiescence search)")
+    for position, fen in POSITIONS.items():
+        board = chess.Board(fen)
+        print(position)
+        for name, options, search_depth in ((f"depth {depth}", {"quiescence": False}, depth),
+                                            (f"depth {depth - 1} + quiescence", {}, depth - 1)):
+            searcher = search_engine.Searcher(search_engine.TranspositionTable(), **options)
+            start = time.perf_counter()
+            move, _ = searcher.search(board, search_depth)
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<22} {searcher.nodes:>8} + {searcher.qnodes:>8} q nodes {elapsed:8.2f}s  "
+                  f"{move} (worth {move_value(board, move, depth)})")
+
+
+if __name__ == "__main__":
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    run(depth)
+    compare_quiescence(depth)
@@ -0,0 +1,248 @@
+import logging
+import os
+import cv2 as cv
+import numpy as np
+import chess
+import model_registry
+import board_vision
+import debug
+import render
+import recognition_cache
+import analysis_cache
+
+# Image -> FEN -> best move pipeline shared by White_Best_Move, Black_Best_Move,
+# white_hint and black_hint. The sides only differ in their model files and
+# in which side the FEN puts to move, so each module wraps one BoardPipeline.
+log = logging.getLogger(__name__)
+
+PIECE_TO_FEN = {'pawn': 'P', 'knight': 'N', 'bishop': 'B', 'rook': 'R', 'queen': 'Q', 'king': 'K'}
+
+
+def generate_fen(detected_pieces, turn=chess.WHITE):
+    board = [['' for _ in range(8)] for _ in range(8)]
+
+    for position, _, color, piece_name in detected_pieces:
+        col = ord(position[0]) - ord('a')
+        row = 8 - int(position[1])
+        fen_char = PIECE_TO_FEN[piece_name.lower()]
+        board[row][col] = fen_char.upper() if color == "White" else fen_char.lower()
+
+    fen_parts = []
+    for row in board:
+        empty = 0
+        row_fen = ''
+        for cell in row:
+            if cell == '':
+                empty += 1
+            else:
+                if empty > 0:
+                    row_fen += str(empty)
+                    empty = 0
+                row_fen += cell
+        if empty > 0:
+            row_fen += str(empty)
+        fen_parts.append(row_fen)
+
+    fen = '/'.join(fen_parts)
+    fen += f" {'w' if turn == chess.WHITE else 'b'} KQkq - 0 1"
+    return fen
+
+
+def detect_pieces(img_blocks, labels):
+    # (square, 85x85 crop, color, piece) for each labelled square, plus the
+    # "piece-square" lists per color
+    detected_pieces = []
+    white_pieces = []
+    black_pieces = []
+    columns = 'abcdefgh'
+    rows = range(8, 0, -1)
+    for i, piece_color, _, piece_name, _ in labels:
+        resized_piece_image = cv.resize(img_blocks[i // 8, i % 8], (85, 85))
+        square_position = f"{columns[i % 8]}{rows[i // 8]}"
+        detected_pieces.append((square_position, resized_piece_image, piece_color, piece_name))
+        piece_info = f"{piece_name}-{square_position}"
+        if piece_color == "White":
+            white_pieces.append(piece_info)
+        else:
+            black_pieces.append(piece_info)
+    return detected_pieces, white_pieces, black_pieces
+
+
+def get_square_image(img, square):
+    file, rank = chess.square_file(square), chess.square_rank(square)
+    height, width, _ = img.shape
+    square_size = height // 8
+    y = (7 - rank) * square_size
+    x = file * square_size
+    return img[y:y+square_size, x:x+square_size]
+
+
+def put_square_image(img, square, square_img):
+    file, rank = chess.square_file(square), chess.square_rank(square)
+    height, width, _ = img.shape
+    square_size = height // 8
+    y = (7 - rank) * square_size
+    x = file * square_size
+    img[y:y+square_size, x:x+square_size] = square_img
+
+
+def extract_piece(img):
+    gray = cv.cvtColor(img, cv.COLOR_BGR2GRAY)
+    _, thresh = cv.threshold(gray, 0, 255, cv.THRESH_BINARY_INV + cv.THRESH_OTSU)
+    contours, _ = cv.findContours(thresh, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+    if contours:
+        mask = np.zeros(img.shape[:2], np.uint8)
+        cv.drawContours(mask, contours, -1, (255), thickness=cv.FILLED)
+        result = cv.bitwise_and(img, img, mask=mask)
+        return result
+    return img
+
+
+def get_empty_square(img, is_white):
+    height, width, _ = img.shape
+    square_size = height // 8
+    color = (240, 217, 181) if is_white else (181, 136, 99)  # RGB colors for white and black squares
+    return np.full((square_size, square_size, 3), color, dtype=np.uint8)
+
+
+def determine_square_color(square):
+    file, rank = chess.square_file(square), chess.square_rank(square)
+    return (file + rank) % 2 == 0  # True for white, False for black
+
+
+def apply_move_to_image(img, move):
+    from_square = move.from_square
+    to_square = move.to_square
+
+    # Get the images of the 'from' and 'to' squares
+    from_img = get_square_image(img, from_square)
+
+    # Determine the colors of the 'from' and 'to' squares
+    from_is_white = determine_square_color(from_square)
+    to_is_white = determine_square_color(to_square)
+
+    # Extract the piece from the 'from' square
+    piece_img = extract_piece(from_img)
+
+    # Replace the 'to' square with an empty square of the appropriate color
+    empty_to_square = get_empty_square(img, to_is_white)
+    put_square_image(img, to_square, empty_to_square)
+
+    # Place the extracted piece on the 'to' square
+    put_square_image(img, to_square, cv.addWeighted(empty_to_square, 0.5, piece_img, 0.5, 0))
+
+    # Replace the 'from' square with an empty square of the appropriate color
+    empty_from_square = get_empty_square(img, from_is_white)
+    put_square_image(img, from_square, empty_from_square)
+
+    return img
+
+
+class BoardPipeline:
+    """Recognition, FEN and best-move rendering for one side's models"""
+
+    def __init__(self, piece_model_path, color_model_path, turn):
+        self.piece_model_path = piece_model_path
+        self.color_model_path = color_model_path
+        self.turn = turn
+
+    def load_your_model(self):
+        return model_registry.get_predictor(self.color_model_path)
+
+    def load_your_piece_model(self):
+        return model_registry.get_predictor(self.piece_model_path)
+
+    def classify_using_model(self, img_blocks):
+        # Color model pass over the squares the HSV pixel counts couldn't decide
+        return board_vision.classify_color_batch(img_blocks, self.load_your_model)
+
+    def classify_piece_name(self, img_block):
+        piece_names, _ = self.classify_piece_names([img_block])
+        return piece_names[0]
+
+    def classify_piece_names(self, img_blocks):
+        # One model.predict call for all occupied squares on the board
+        return board_vision.classify_piece_batch(img_blocks, self.load_your_piece_model)
+
+    def recognize_squares(self, img_blocks):
+        # (index, color, color confidence, piece, piece confidence) for each occupied square
+        return board_vision.recognize_squares(img_blocks, self.classify_using_model, self.classify_piece_names)
+
+    @staticmethod
+    def preprocess_input_image(imagefile):
+        # Accepts encoded bytes, a decoded BGR array or a path
+        img = board_vision.load_image(imagefile)
+        img = cv.cvtColor(img, cv.COLOR_BGR2RGB)
+        # (8, 8, S, S, 3) view of the squares, indexed [row, column] from a8
+        return board_vision.tile_board(img)
+
+    def generate_fen(self, detected_pieces):
+        return generate_fen(detected_pieces, self.turn)
+
+    def process_chessboard(self, imagefile):
+        """FEN of the board in `imagefile` with this side to move, or None if it can't be read"""
+        try:
+            img_blocks = self.preprocess_input_image(imagefile)
+        except ValueError as e:
+            log.error("Could not read the board image: %s", e)
+            return
+
+        # Repeat and near-duplicate boards get their labels from the recognition
+        # cache without running the models
+        labels = recognition_cache.recognize(img_blocks, self.recognize_squares)
+        detected_pieces, white_pieces, black_pieces = detect_pieces(img_blocks, labels)
+        log.debug("White pieces: %s", ", ".join(white_pieces))
+        log.debug("Black pieces: %s", ", ".join(black_pieces))
+
+        fen = self.generate_fen(detected_pieces)
+        log.debug("FEN: %s (%d squares with pieces)", fen, len(detected_pieces))
+
+        if debug.enabled():
+            # Diagnostic images of the board and its detected pieces
+            debug.save_detection(board_vision.board_from_tiles(img_blocks), detected_pieces)
+
+        return fen
+
+    def process_and_move(self, imagefile, results_folder, limits=None, name=None):
+        """
+        Recognize the board, find this side's best move and save the
+        before/after comparison as `{name}_comparison{ext}` in
+        `results_folder`. `imagefile` may be encoded bytes, a decoded BGR array
+        or a path; it is decoded once and shared by recognition and rendering.
+        `name` defaults to the file name. Returns (best move, file name), or
+        (None, None).
+        """
+        try:
+            original_img = board_vision.load_image(imagefile)
+        except ValueError as e:
+            log.error("Could not read the board image: %s", e)
+            return None, None
+
+        fen = self.process_chessboard(original_img)
+        if not fen:
+            return None, None
+
+        # The engine searches for board.turn, which the FEN sets for this side;
+        # positions already analysed with these limits come from the cache
+        board = chess.Board(fen)
+        result = analysis_cache.best_move(board, limits, results_folder)
+        best_move = result['move']
+        log.debug("Best move: %s (score %s, depth %s)", best_move, result['score'], result['depth'])
+        if not best_move:
+            log.info("No valid move found.")
+            return None, None
+
+        updated_img = apply_move_to_image(original_img.copy(), best_move)
+        # Compose and encode the before/after comparison in memory
+        image_bytes = render.render_comparison(original_img, updated_img, best_move)
+
+        if name is None:
+            is_path = isinstance(imagefile, (str, os.PathLike))
+            name = os.path.splitext(os.path.basename(imagefile))[0] if is_path else os.urandom(4).hex()
+        result_image_filename = f"{name}_comparison{render.extension()}"
+        save_path = os.path.join(results_folder, result_image_filename)
+        with open(save_path, 'wb') as f:
+            f.write(image_bytes)
+        log.debug("Saved comparison image to: %s", save_path)
+
+        return best_move, result_image_filename
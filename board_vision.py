@@ -0,0 +1,286 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import cv2 as cv
+import numpy as np
+
+PIECE_CLASSES = ['bishop', 'king', 'knight', 'pawn', 'queen', 'rook']
+PIECE_INPUT_SIZE = 85
+COLOR_INPUT_SIZE = 224
+
+# HSV ranges for clearly black and clearly white piece pixels
+BLACK_HSV_RANGE = (np.array([0, 0, 0]), np.array([180, 255, 50]))
+WHITE_HSV_RANGE = (np.array([0, 0, 200]), np.array([180, 25, 255]))
+
+# Fraction of a square's interior that must lie on or inside a piece outline
+# for it to count as occupied. Pieces score 0.15+, textured empty squares < 0.1.
+OCCUPANCY_THRESHOLD = 0.12
+_CLOSE_KERNEL = np.ones((5, 5), np.uint8)
+
+# Piece-model outputs remembered per distinct 85x85 crop
+CROP_CACHE_SIZE = int(os.environ.get('CHESS_CROP_CACHE_SIZE', 4096))
+
+
+class CropCache:
+    """
+    Bounded LRU of model outputs keyed by the model loader and a hash of the
+    exact crop pixels. Rendered diagrams repeat the same piece image on many
+    squares and boards, so most crops after the first few are hits.
+    """
+
+    def __init__(self, max_entries=CROP_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model_loader, crop):
+        crop = np.ascontiguousarray(crop)
+        digest = hashlib.blake2b(crop.tobytes(), digest_size=16)
+        digest.update(str(crop.shape).encode())
+        return model_loader, digest.digest()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self.entries),
+        }
+
+
+piece_crop_cache = CropCache()
+
+
+def load_image(source):
+    """
+    Decode a board image once, from encoded bytes, an already decoded BGR
+    array or a file path. Returns the BGR array; raises ValueError if the
+    image can't be read.
+    """
+    if isinstance(source, np.ndarray):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        img = cv.imdecode(np.frombuffer(source, dtype=np.uint8), cv.IMREAD_COLOR)
+        if img is None:
+            raise ValueError("Unable to decode the uploaded image")
+        return img
+    img = cv.imread(os.fspath(source))
+    if img is None:
+        raise ValueError(f"Unable to read the image file: {source}")
+    return img
+
+
+def prepare_piece_batch(crops):
+    """Stack square crops into a single (N, 85, 85, 3) float32 tensor scaled to [0, 1]"""
+    batch = np.empty((len(crops), PIECE_INPUT_SIZE, PIECE_INPUT_SIZE, 3), dtype=np.float32)
+    for i, crop in enumerate(crops):
+        if crop.shape[:2] != (PIECE_INPUT_SIZE, PIECE_INPUT_SIZE):
+            crop = cv.resize(crop, (PIECE_INPUT_SIZE, PIECE_INPUT_SIZE))
+        batch[i] = crop
+    batch /= 255.0
+    return batch
+
+
+def classify_piece_batch(crops, model_loader, cache=None):
+    """
+    Classify every crop with at most one forward pass of the piece model.
+    Crops already in `cache` (piece_crop_cache by default) reuse their stored
+    probabilities, and identical crops on the same board are predicted once.
+    Returns the argmax labels and the (N, 6) class probabilities; the model
+    is only requested from `model_loader` when something is left to classify.
+    """
+    cache = piece_crop_cache if cache is None else cache
+    probabilities = np.empty((len(crops), len(PIECE_CLASSES)), dtype=np.float32)
+    pending = OrderedDict()  # crop key -> (crop, indices of the crops that share it)
+    for i, crop in enumerate(crops):
+        if crop.shape[:2] != (PIECE_INPUT_SIZE, PIECE_INPUT_SIZE):
+            crop = cv.resize(crop, (PIECE_INPUT_SIZE, PIECE_INPUT_SIZE))
+        key = cache.key(model_loader, crop)
+        if key in pending:
+            pending[key][1].append(i)
+            continue
+        cached = cache.get(key)
+        if cached is not None:
+            probabilities[i] = cached
+        else:
+            pending[key] = (crop, [i])
+
+    if pending:
+        model = model_loader()
+        batch = prepare_piece_batch([crop for crop, _ in pending.values()])
+        predicted = np.asarray(model.predict(batch, verbose=0))
+        for (key, (_, indices)), row in zip(pending.items(), predicted):
+            cache.put(key, row)
+            probabilities[indices] = row
+
+    labels = [PIECE_CLASSES[i] for i in probabilities.argmax(axis=1)]
+    return labels, probabilities
+
+
+def tile_board(img):
+    """
+    Split a board image into an (8, 8, S, S, ...) array of squares, indexed
+    [row, column] from the a8 corner. Non-square images are resized to a square
+    so the right/bottom files are not dropped, and the board is cropped to a
+    multiple of 8 pixels. The result is a read-only strided view, not a copy.
+    """
+    height, width = img.shape[:2]
+    square_size = min(height, width) // 8
+    if square_size == 0:
+        raise ValueError(f"Image is too small to hold a chessboard: {width}x{height}")
+    if height != width:
+        img = cv.resize(img, (8 * square_size, 8 * square_size), interpolation=cv.INTER_AREA)
+    img = img[:8 * square_size, :8 * square_size]
+
+    row_stride, col_stride = img.strides[:2]
+    return np.lib.stride_tricks.as_strided(
+        img,
+        shape=(8, 8, square_size, square_size) + img.shape[2:],
+        strides=(square_size * row_stride, square_size * col_stride) + img.strides,
+        writeable=False,
+    )
+
+
+def board_from_tiles(tiles):
+    """Inverse of tile_board: the full (8S, 8S, ...) board behind a tiled array"""
+    square_size = tiles.shape[2]
+    board_shape = (8 * square_size, 8 * square_size) + tiles.shape[4:]
+    row_stride, col_stride = tiles.strides[2:4]
+    if tiles.strides[:2] == (square_size * row_stride, square_size * col_stride):
+        # A view from tile_board: re-stride the same memory, no copy
+        return np.lib.stride_tricks.as_strided(tiles, shape=board_shape, strides=tiles.strides[2:], writeable=False)
+    return tiles.swapaxes(1, 2).reshape(board_shape)
+
+
+def detect_occupancy(tiles, threshold=OCCUPANCY_THRESHOLD):
+    """
+    Score all 64 squares for a piece in one pass over the whole board.
+    Blur, Canny and the closing run once on the full grayscale board. Edges in
+    a margin around every square are cleared so the light/dark boundaries
+    don't count, then one flood fill from the margins marks everything that is
+    not enclosed by an outline. The score of a square is the fraction of its
+    interior covered by edges or enclosed regions, the whole-board analogue of
+    the old per-square contour area. Returns 8x8 (occupied, score) arrays.
+    """
+    board = board_from_tiles(tiles)
+    gray = cv.cvtColor(board, cv.COLOR_RGB2GRAY)
+    blurred = cv.GaussianBlur(gray, (5, 5), 0)
+    edges = cv.Canny(blurred, 50, 150)
+    edges = cv.morphologyEx(edges, cv.MORPH_CLOSE, _CLOSE_KERNEL)
+
+    square_size = tiles.shape[2]
+    margin = min(max(4, square_size // 10), (square_size - 1) // 2)
+    edge_squares = edges.reshape(8, square_size, 8, square_size)
+    edge_squares[:, :margin] = 0
+    edge_squares[:, square_size - margin:] = 0
+    edge_squares[:, :, :, :margin] = 0
+    edge_squares[:, :, :, square_size - margin:] = 0
+
+    # The cleared margins form one connected background, so a single fill
+    # from the corner reaches every square that has no closed outline
+    filled = edges.copy()
+    cv.floodFill(filled, None, (0, 0), 255)
+    covered = (filled == 0) | (edges > 0)
+
+    interior = tile_board(covered)[:, :, margin:square_size - margin, margin:square_size - margin]
+    score = np.count_nonzero(interior, axis=(2, 3)) / (interior.shape[2] * interior.shape[3])
+    return score >= threshold, score
+
+
+def count_color_pixels(tiles):
+    """Per-square counts of clearly white and clearly black pixels as two 8x8 arrays"""
+    hsv = cv.cvtColor(board_from_tiles(tiles), cv.COLOR_RGB2HSV)
+    white_mask = tile_board(cv.inRange(hsv, *WHITE_HSV_RANGE))
+    black_mask = tile_board(cv.inRange(hsv, *BLACK_HSV_RANGE))
+    return np.count_nonzero(white_mask, axis=(2, 3)), np.count_nonzero(black_mask, axis=(2, 3))
+
+
+def classify_color_batch(crops, model_loader):
+    """Run the color model once over all crops, returning labels and confidences"""
+    if len(crops) == 0:
+        return [], np.empty(0, dtype=np.float32)
+    batch = np.empty((len(crops), COLOR_INPUT_SIZE, COLOR_INPUT_SIZE, 3), dtype=np.float32)
+    for i, crop in enumerate(crops):
+        batch[i] = cv.resize(crop, (COLOR_INPUT_SIZE, COLOR_INPUT_SIZE))
+    batch /= 255.0
+    white_probability = np.asarray(model_loader().predict(batch, verbose=0))[:, 0]
+    labels = ['White' if p > 0.5 else 'Black' for p in white_probability]
+    return labels, np.maximum(white_probability, 1 - white_probability)
+
+
+def classify_colors(tiles, occupied, classify_ambiguous):
+    """
+    Decide the piece color of every occupied square.
+    A square with at least twice as many white as black pixels is White (and
+    vice versa); only the remaining ambiguous squares are handed, as one list
+    of crops, to `classify_ambiguous`, which returns (labels, confidences).
+    Returns 8x8 arrays of colors (None for empty squares) and confidences.
+    """
+    white_counts, black_counts = count_color_pixels(tiles)
+    colors = np.full((8, 8), None, dtype=object)
+    confidence = np.zeros((8, 8), dtype=np.float32)
+
+    is_white = occupied & (white_counts >= 2 * black_counts)
+    is_black = occupied & ~is_white & (black_counts >= 2 * white_counts)
+    colors[is_white] = 'White'
+    colors[is_black] = 'Black'
+    total = np.maximum(white_counts + black_counts, 1)
+    confidence[is_white] = (white_counts / total)[is_white]
+    confidence[is_black] = (black_counts / total)[is_black]
+
+    ambiguous = np.argwhere(occupied & ~is_white & ~is_black)
+    if len(ambiguous):
+        labels, model_confidence = classify_ambiguous([tiles[row, col] for row, col in ambiguous])
+        for (row, col), label, p in zip(ambiguous, labels, model_confidence):
+            colors[row, col] = label
+            confidence[row, col] = p
+    return colors, confidence
+
+
+def recognize_squares(tiles, classify_ambiguous, classify_pieces):
+    """
+    Label every occupied square of a tiled board: occupancy and colors from
+    the whole-board passes, then one batched piece-model call. Returns a list
+    of (square index from a8, color, color confidence, piece name, piece
+    confidence) tuples; the piece confidence is None if `classify_pieces`
+    returned no probabilities.
+    """
+    occupied, _ = detect_occupancy(tiles)
+    colors, color_confidence = classify_colors(tiles, occupied, classify_ambiguous)
+    indices = np.flatnonzero(occupied)
+    crops = [cv.resize(tiles[i // 8, i % 8], (PIECE_INPUT_SIZE, PIECE_INPUT_SIZE)) for i in indices]
+    names, probabilities = classify_pieces(crops)
+
+    labels = []
+    for k, i in enumerate(indices):
+        row, col = divmod(int(i), 8)
+        piece_confidence = float(probabilities[k].max()) if probabilities is not None else None
+        labels.append((int(i), colors[row, col], float(color_confidence[row, col]), names[k], piece_confidence))
+    return labels
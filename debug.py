@@ -0,0 +1,59 @@
+import logging
+import os
+import threading
+import time
+import cv2 as cv
+import numpy as np
+
+# Diagnostic output switch. By default the recognition and search path only
+# logs warnings and builds no diagnostic images. With CHESS_DEBUG set, the
+# modules log their intermediate results at DEBUG level and every recognized
+# board is written, with a labelled sheet of its piece crops, to
+# CHESS_DEBUG_DIR.
+DEBUG_DIR = os.environ.get('CHESS_DEBUG_DIR', 'debug')
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+_counter = 0
+_lock = threading.Lock()
+
+
+def enabled():
+    return os.environ.get('CHESS_DEBUG', '').lower() in ('1', 'true', 'yes')
+
+
+def configure_logging():
+    """Root logging setup for the entry points: DEBUG when enabled, WARNING otherwise"""
+    logging.basicConfig(level=logging.DEBUG if enabled() else logging.WARNING, format=LOG_FORMAT)
+
+
+def artifact_path(name, ext='.png'):
+    """A fresh path in the debug directory, prefixed so artifacts sort by time"""
+    global _counter
+    with _lock:
+        _counter += 1
+        counter = _counter
+    os.makedirs(DEBUG_DIR, exist_ok=True)
+    return os.path.join(DEBUG_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{counter:04d}_{name}{ext}")
+
+
+def piece_sheet(detected_pieces, columns=8):
+    """Grid of the detected (position, RGB crop, color, name) pieces with a caption under each"""
+    cell, caption = 85, 18
+    rows = max(1, -(-len(detected_pieces) // columns))
+    sheet = np.full((rows * (cell + caption), columns * cell, 3), 255, dtype=np.uint8)
+    for i, (position, crop, color, name) in enumerate(detected_pieces):
+        y, x = (i // columns) * (cell + caption), (i % columns) * cell
+        sheet[y:y + cell, x:x + cell] = cv.resize(crop, (cell, cell))
+        cv.putText(sheet, f"{position} {color[0]}{name[:2]}", (x + 2, y + cell + 13),
+                   cv.FONT_HERSHEY_SIMPLEX, 0.4, (0, 0, 0), 1, cv.LINE_AA)
+    return sheet
+
+
+def save_detection(board_rgb, detected_pieces, name='board'):
+    """Write the board and its piece sheet to the debug directory, returning the paths"""
+    board_path = artifact_path(name)
+    pieces_path = artifact_path(f"{name}_pieces")
+    cv.imwrite(board_path, cv.cvtColor(np.ascontiguousarray(board_rgb), cv.COLOR_RGB2BGR))
+    cv.imwrite(pieces_path, cv.cvtColor(piece_sheet(detected_pieces), cv.COLOR_RGB2BGR))
+    logging.getLogger(__name__).debug("Saved debug artifacts %s and %s", board_path, pieces_path)
+    return board_path, pieces_path
@@ -0,0 +1,140 @@
+import random
+import chess
+import analysis_cache
+
+# Hint text for an engine result, shared by white_hint, black_hint and the API.
+# Each piece type has 15 hints ordered by the pawn-unit score they suit.
+base_hint_templates = { 
+    "Pawn": [
+        "2.3 Consider advancing this pawn to control the center.",
+        "2.5 Use this pawn to support other pieces.",
+        "1.8 Push the pawn to create a stronghold for your attack.",
+        "3.1 Place this pawn in front of your king for protection.",
+        "2.2 Advance the pawn to block the opponent's pieces.",
+        "2.7 Use this pawn to gain space on the queenside.",
+        "2.1 Push the pawn to gain tempo in your development.",
+        "1.9 Consider a pawn push to open up the game.",
+        "2.4 Place the pawn where it can restrict the opponent's knight.",
+        "2.6 Consider advancing the pawn to challenge the opponent's center.",
+        "2.8 Place the pawn where it can control a key square in the center.",
+        "3.0 Push the pawn to create a passed pawn in the endgame.",
+        "2.1 Move the pawn to limit the movement of your opponent's pieces.",
+        "2.3 Consider pushing the pawn to initiate an attack on the flank.",
+        "2.6 Use this pawn to defend against an incoming attack.",
+    ],
+    "Rook": [
+        "3.1 Move the rook to an open file to maximize control.",
+        "2.8 Use the rook to attack opponent's weak pawns.",
+        "2.5 Consider doubling your rooks on an open file.",
+        "3.0 Position your rook on the seventh rank to create pressure.",
+        "2.7 Activate the rook to attack the opponent's back rank.",
+        "2.4 Position your rook to support your central pawns.",
+        "2.9 Keep your rook on an open file to limit the opponent's options.",
+        "2.6 Place the rook behind your passed pawn to support its advancement.",
+        "2.8 Use the rook to cut off the opponent's king from the center.",
+        "2.3 Place the rook to defend your own king while attacking.",
+        "3.1 Keep your rook active to control open lines and ranks.",
+        "2.5 Use the rook to protect your pieces while launching a counterattack.",
+        "2.9 Consider placing the rook in a strong defensive position to support your king.",
+        "2.7 Keep the rook centralized to control more of the board.",
+        "2.4 Use the rook in coordination with other pieces for a checkmate threat.",
+    ],
+    "Knight": [
+        "3.2 Move the knight to fork two opponent pieces.",
+        "2.6 Place the knight on a central square for more control.",
+        "2.3 Consider moving the knight to protect other pieces.",
+        "2.8 Position your knight to control the center of the board.",
+        "2.9 Place the knight on a square where it can attack key squares.",
+        "2.4 Keep the knight close to the king for extra defense.",
+        "3.1 Move the knight to attack undefended pieces.",
+        "2.7 Position the knight to control key diagonal squares.",
+        "2.5 Use the knight to protect pawns in the center.",
+        "2.2 Consider a knight jump to create a tactical threat.",
+        "2.9 Place the knight where it can threaten your opponent's back rank.",
+        "2.6 Move the knight to a position where it can attack your opponent's pawns.",
+        "3.0 Use the knight to create a double attack on your opponent's pieces.",
+        "2.8 Consider a knight maneuver to create a check or fork.",
+        "2.4 Place the knight in an advanced position to gain more space.",
+    ],
+    "Bishop": [
+        "3.1 Consider moving the bishop to control long diagonals.",
+        "2.7 Place the bishop on an open diagonal for flexibility.",
+        "2.5 Move the bishop to pin an opponent's knight.",
+        "2.9 Use the bishop to control the center from a distance.",
+        "2.4 Place the bishop on a light square to support your pawn structure.",
+        "2.8 Place the bishop where it can attack the opponent's pawns.",
+        "2.6 Use the bishop to defend against opponent's piece attacks.",
+        "2.3 Position your bishop to support a kingside attack.",
+        "3.0 Move the bishop to an open diagonal to control more space.",
+        "2.7 Consider the bishop as a long-term defender in the endgame.",
+        "2.9 Use the bishop to restrict your opponent's king's mobility.",
+        "2.5 Move the bishop to a position where it can pin your opponent's pieces.",
+        "2.8 Position the bishop to control multiple squares on the board.",
+        "2.4 Consider using the bishop to control both sides of the board.",
+        "2.6 Place the bishop where it can protect your pawns from attacks.",
+    ],
+    "Queen": [
+        "3.2 Move the queen to support your other pieces.",
+        "2.1 Avoid bringing the queen out too early in the game.",
+        "2.7 Consider placing the queen on an open diagonal.",
+        "2.9 Position the queen to control both the center and the flank.",
+        "3.0 Use the queen to threaten the opponent's back rank.",
+        "2.5 Coordinate your queen with the rooks to increase pressure.",
+        "2.8 Move the queen to help create a checkmate threat.",
+        "2.3 Position the queen to support a pawn promotion.",
+        "2.6 Use the queen to restrict the opponent's king's mobility.",
+        "3.1 Keep the queen active in the center to control key squares.",
+        "2.4 Position the queen to support a kingside attack.",
+        "2.7 Move the queen to a square where it can defend your pawns.",
+        "2.9 Consider placing the queen on a long-range diagonal to control space.",
+        "2.5 Use the queen to create a tactical threat with your knights or rooks.",
+        "3.0 Keep the queen near the center to maximize its influence.",
+    ],
+    "King": [
+        "2.8 Castle early to secure your king.",
+        "3.1 Move the king to safety during the endgame.",
+        "2.5 Keep the king shielded by pawns.",
+        "2.9 In the endgame, activate the king to support pawn advancement.",
+        "2.7 Use the king to support your pieces in the late game.",
+        "2.6 Move the king toward the center in the endgame for more mobility.",
+        "2.3 Position the king away from the edge to avoid attacks.",
+        "2.8 Consider a king maneuver to help control the center.",
+        "3.0 Ensure the king is well defended as the opponent launches an attack.",
+        "2.4 Place the king in a safe, defended position during the middle game.",
+        "2.7 Move the king to a corner where it can be protected by pawns.",
+        "2.9 Keep the king close to your advanced pawns to support their promotion.",
+        "2.5 Avoid placing the king on open ranks to reduce attack vulnerability.",
+        "2.8 Consider positioning the king in the center during the late game for more mobility.",
+        "2.6 Place the king where it can easily escape if the opponent initiates a checkmate threat.",
+    ]
+}
+
+
+def hint_from_result(board, result, fallback="Consider developing your pieces and controlling the center.", suffix=""):
+    # Hint text for an engine result that has already been computed
+    best_move = result['move']
+    best_value = result['score'] / 100  # hint templates are keyed on pawn units
+
+    if best_move:
+        piece_type = board.piece_type_at(best_move.from_square)
+        if piece_type is None:
+            return "No valid move found."
+
+        piece_name = chess.piece_name(piece_type).capitalize()
+        if piece_name in base_hint_templates:
+            if best_value < -3 or best_value > 3:
+                hint = random.choice(base_hint_templates[piece_name])
+            else:
+                hint_index = int((best_value + 4) // 0.5)
+                hint_index = max(0, min(hint_index, len(base_hint_templates[piece_name]) - 1))
+                hint = base_hint_templates[piece_name][hint_index]
+        else:
+            hint = fallback
+
+        return f"{hint}{suffix}"
+    return "No valid move found."
+
+
+def get_hint_from_best_move(board, limits=None, results_folder=None, **kwargs):
+    """Search `board` for the side to move and return a hint for the best move"""
+    return hint_from_result(board, analysis_cache.best_move(board, limits, results_folder), **kwargs)
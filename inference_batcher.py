@@ -0,0 +1,104 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+import numpy as np
+
+# Cross-request micro-batching for Keras models. Concurrent requests each
+# used to call model.predict() on their own few crops; a MicroBatcher
+# collects the crops of every in-flight request for up to MAX_WAIT_MS (or
+# until MAX_BATCH rows are waiting), runs one predict on a single inference
+# thread and hands each request back its own rows.
+MAX_BATCH = int(os.environ.get('CHESS_INFERENCE_MAX_BATCH', 128))
+MAX_WAIT_MS = float(os.environ.get('CHESS_INFERENCE_MAX_WAIT_MS', 5))
+
+log = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Wraps a model with the same predict(batch, verbose=0) call, so it can be
+    returned by the board_vision model loaders in place of the model itself.
+    """
+
+    def __init__(self, model, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, name=None):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.name = name or repr(model)
+        # The inference thread doesn't survive a fork; see model_registry.get_predictor
+        self.pid = os.getpid()
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+        self.batch_sizes = Counter()
+        self.requests_per_batch = Counter()
+        self.thread = threading.Thread(target=self.run, name=f"inference-{self.name}", daemon=True)
+        self.thread.start()
+
+    def predict(self, batch, verbose=0):
+        """Queue `batch` for the next combined predict and block until its rows are back"""
+        batch = np.asarray(batch)
+        if len(batch) == 0:
+            return self.model.predict(batch, verbose=verbose)
+        future = Future()
+        self.requests.put((batch, future))
+        return future.result()
+
+    def collect(self):
+        # Block for the first request, then take whatever arrives within the wait window
+        pending = [self.requests.get()]
+        rows = len(pending[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait()
+            except queue.Empty:
+                break
+            pending.append(request)
+            rows += len(request[0])
+        return pending, rows
+
+    def run(self):
+        while True:
+            pending, rows = self.collect()
+            # Requests with differently shaped crops can't share a tensor
+            groups = {}
+            for batch, future in pending:
+                groups.setdefault(batch.shape[1:], []).append((batch, future))
+            for group in groups.values():
+                self.predict_group(group)
+            with self.lock:
+                self.batch_sizes[rows] += 1
+                self.requests_per_batch[len(pending)] += 1
+
+    def predict_group(self, group):
+        try:
+            combined = np.concatenate([batch for batch, _ in group]) if len(group) > 1 else group[0][0]
+            predicted = np.asarray(self.model.predict(combined, verbose=0))
+        except Exception as e:
+            for _, future in group:
+                future.set_exception(e)
+            return
+        start = 0
+        for batch, future in group:
+            future.set_result(predicted[start:start + len(batch)])
+            start += len(batch)
+
+    def stats(self):
+        with self.lock:
+            batches = sum(self.batch_sizes.values())
+            rows = sum(size * count for size, count in self.batch_sizes.items())
+            requests = sum(size * count for size, count in self.requests_per_batch.items())
+            return {
+                'batches': batches,
+                'rows': rows,
+                'requests': requests,
+                'mean_batch_size': rows / batches if batches else 0.0,
+                'mean_requests_per_batch': requests / batches if batches else 0.0,
+                'batch_sizes': dict(sorted(self.batch_sizes.items())),
+                'requests_per_batch': dict(sorted(self.requests_per_batch.items())),
+            }
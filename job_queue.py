@@ -0,0 +1,213 @@
+import multiprocessing
+import os
+import statistics
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Local job queue for analyses. Jobs run in a pool of worker processes
+# that load the models once at start, so a slow board holds up a worker,
+# not a request thread. Requests get a job id back immediately and poll for
+# the result. This in-process queue stands in for an external broker.
+WORKERS = int(os.environ.get('CHESS_JOB_WORKERS', 2))
+MAX_QUEUED = int(os.environ.get('CHESS_JOB_QUEUE_DEPTH', 32))
+JOB_TIMEOUT_S = float(os.environ.get('CHESS_JOB_TIMEOUT_S', 60))
+# Finished jobs are kept for polling until this many have piled up
+MAX_FINISHED = 1000
+
+QUEUED, RUNNING, DONE, FAILED, TIMED_OUT = 'queued', 'running', 'done', 'failed', 'timeout'
+
+
+class QueueFull(Exception):
+    """Raised by submit() when MAX_QUEUED jobs are already waiting or running"""
+
+
+def _init_worker():
+    # Each worker runs one job at a time, so there is nothing to micro-batch
+    os.environ['CHESS_MICRO_BATCHING'] = '0'
+    # Warm each worker up front: import the pipeline and load both sides' models
+    import analysis
+    import model_registry
+    model_registry.warm_up(analysis.White_Best_Move.MODEL_PATHS + analysis.Black_Best_Move.MODEL_PATHS)
+
+
+def _run_job(image, side, mode, limits, results_folder, render_format):
+    import analysis
+    started_at = time.time()
+    return started_at, analysis.analyze(image, side, mode, limits, results_folder, render_format)
+
+
+class JobQueue:
+    def __init__(self, workers=WORKERS, max_queued=MAX_QUEUED, timeout_s=JOB_TIMEOUT_S):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.timeout_s = timeout_s
+        self.pool = None
+        self.jobs = OrderedDict()
+        # Re-entrant: cancelling a queued future in time_out() runs finish() right away
+        self.lock = threading.RLock()
+        self.latencies = deque(maxlen=1000)
+        self.counts = {'submitted': 0, 'rejected': 0, DONE: 0, FAILED: 0, TIMED_OUT: 0}
+
+    def start(self):
+        """Start the worker processes now instead of on the first job"""
+        with self.lock:
+            if self.pool is None:
+                # Spawned rather than forked: the server process holds TensorFlow
+                # state, threads and SQLite connections that can't cross a fork,
+                # and each worker should load its own models
+                self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                                initializer=_init_worker)
+                # One no-op per worker makes the pool spawn and warm them all
+                for _ in range(self.workers):
+                    self.pool.submit(time.time)
+        return self
+
+    def submit(self, image, side='white', mode='best_move', limits=None, results_folder=None, render_format=None):
+        """Queue an analysis.analyze() call and return its job id"""
+        self.start()
+        limits = dict(limits or {})
+        # Jobs already run in parallel; each one searches in its own worker.
+        # The search budget is capped so it finishes within the job timeout.
+        limits['workers'] = 1
+        budget_ms = int(self.timeout_s * 1000 * 0.8)
+        limits['time_ms'] = min(limits.get('time_ms') or budget_ms, budget_ms)
+
+        with self.lock:
+            self.expire()
+            pending = sum(1 for job in self.jobs.values() if self.occupies_worker(job))
+            if pending >= self.max_queued:
+                self.counts['rejected'] += 1
+                raise QueueFull(f"{pending} analyses are already queued or running; try again shortly")
+
+            job_id = uuid.uuid4().hex
+            submitted_at = time.time()
+            future = self.pool.submit(_run_job, image, side, mode, limits, results_folder, render_format)
+            self.jobs[job_id] = {
+                'id': job_id,
+                'status': QUEUED,
+                'submitted_at': submitted_at,
+                'future': future,
+                'result': None,
+                'error': None,
+                'queue_latency_ms': None,
+                'still_running': False,
+            }
+            self.counts['submitted'] += 1
+        future.add_done_callback(lambda f: self.finish(job_id, f))
+        return job_id
+
+    def finish(self, job_id, future):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            job['still_running'] = False
+            if job['status'] == TIMED_OUT or future.cancelled():
+                return
+            if time.time() - job['submitted_at'] > self.timeout_s:
+                self.time_out(job)
+                return
+            try:
+                started_at, result = future.result()
+            except Exception as e:
+                job['status'] = FAILED
+                job['error'] = str(e)
+                self.counts[FAILED] += 1
+                return
+            job['queue_latency_ms'] = round((started_at - job['submitted_at']) * 1000, 2)
+            self.latencies.append(job['queue_latency_ms'])
+            job['status'] = DONE
+            job['result'] = result
+            self.counts[DONE] += 1
+
+    def time_out(self, job):
+        # A job still waiting is never started; a running one finishes in its
+        # worker but its result is discarded. Until then it keeps the worker
+        # busy, so it still counts against the queue depth.
+        job['still_running'] = not job['future'].cancel() and not job['future'].done()
+        job['status'] = TIMED_OUT
+        job['error'] = f"The analysis did not finish within {self.timeout_s:g} s"
+        self.counts[TIMED_OUT] += 1
+
+    @staticmethod
+    def occupies_worker(job):
+        return job['status'] in (QUEUED, RUNNING) or job['still_running']
+
+    def expire(self):
+        # Called with the lock held: time out overdue jobs and drop old finished ones
+        now = time.time()
+        for job in self.jobs.values():
+            if job['status'] in (QUEUED, RUNNING) and now - job['submitted_at'] > self.timeout_s:
+                self.time_out(job)
+        finished = [job_id for job_id, job in self.jobs.items() if not self.occupies_worker(job)]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED)]:
+            del self.jobs[job_id]
+
+    def status(self, job_id):
+        """The job's status, plus its result or error once it has one; None for unknown ids"""
+        with self.lock:
+            self.expire()
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job['status'] == QUEUED and job['future'].running():
+                job['status'] = RUNNING
+            response = {
+                'id': job_id,
+                'status': job['status'],
+                'age_ms': round((time.time() - job['submitted_at']) * 1000, 2),
+            }
+            if job['queue_latency_ms'] is not None:
+                response['queue_latency_ms'] = job['queue_latency_ms']
+            if job['result'] is not None:
+                response['result'] = job['result']
+            if job['error'] is not None:
+                response['error'] = job['error']
+            return response
+
+    def metrics(self):
+        with self.lock:
+            self.expire()
+            latencies = sorted(self.latencies)
+            queued = sum(1 for job in self.jobs.values() if job['status'] == QUEUED and not job['future'].running())
+            running = sum(1 for job in self.jobs.values() if job['status'] in (QUEUED, RUNNING) and job['future'].running())
+            timed_out_running = sum(1 for job in self.jobs.values() if job['still_running'])
+            return dict(
+                self.counts,
+                workers=self.workers,
+                max_queued=self.max_queued,
+                timeout_s=self.timeout_s,
+                queued=queued,
+                running=running,
+                timed_out_running=timed_out_running,
+                queue_latency_ms={
+                    'count': len(latencies),
+                    'mean': round(statistics.fmean(latencies), 2) if latencies else None,
+                    'p50': latencies[len(latencies) // 2] if latencies else None,
+                    'p95': latencies[int(len(latencies) * 0.95)] if latencies else None,
+                    'max': latencies[-1] if latencies else None,
+                },
+            )
+
+    def shutdown(self):
+        with self.lock:
+            pool, self.pool = self.pool, None
+        # Outside the lock: jobs finishing during shutdown call finish()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+_default_queue = None
+_default_lock = threading.Lock()
+
+
+def default_queue(workers=None, max_queued=None, timeout_s=None):
+    """The process-wide queue the Flask apps share; the settings apply when it is first created"""
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue(workers or WORKERS, max_queued or MAX_QUEUED, timeout_s or JOB_TIMEOUT_S)
+    return _default_queue
@@ -1,14 +1,31 @@
 import cv2 as cv
 import numpy as np
 import chess
-from tensorflow.keras.models import load_model
-import matplotlib.pyplot as plt
+import model_registry
+import board_vision
+import recognition_cache
+import analysis_cache
+import board_pipeline
+import hints
 from PIL import Image
 import io
+import hashlib
 import streamlit as st
-import random
 import os
 
+# The models are shared on Google Drive; load_model() can't read these links, so
+# download them into CHESS_MODEL_DIR ('models') or point the env vars at local copies
+COLOR_MODEL_URL = r'https://drive.google.com/file/d/1GhZpHqWBIzUG2psayZOK9mdsK0osuWSJ/view?usp=sharing'
+PIECE_MODEL_URL = r'https://drive.google.com/file/d/11Dxh6WoB2xqHquRVLatP67bCy6ZCRV24/view?usp=sharing'
+# Local model files, or None when no copy was found and the fallbacks are used
+COLOR_MODEL_PATH = model_registry.resolve_model_path('color_model.h5', os.environ.get('CHESS_COLOR_MODEL'))
+PIECE_MODEL_PATH = model_registry.resolve_model_path('chess_piece_classification_model.h5',
+                                                     os.environ.get('CHESS_PIECE_MODEL'))
+# Distinct images whose recognition output st.cache_data keeps per server process
+RECOGNITION_CACHE_SIZE = int(os.environ.get('CHESS_STREAMLIT_RECOGNITION_CACHE', 64))
+# Search results kept per session, keyed by (FEN, perspective, depth, time budget)
+SEARCH_CACHE_SIZE = 32
+
 # Page configuration - MUST BE FIRST STREAMLIT COMMAND
 st.set_page_config(
     layout="wide", 
@@ -307,6 +324,10 @@ if 'selected_image_path' not in st.session_state:
     st.session_state.selected_image_path = None
 if 'uploaded_image' not in st.session_state:
     st.session_state.uploaded_image = None
+if 'recognition' not in st.session_state:
+    st.session_state.recognition = None
+if 'search_results' not in st.session_state:
+    st.session_state.search_results = {}
 
 # Enhanced Title Section
 st.markdown("""
@@ -340,112 +361,6 @@ DEFAULT_IMAGES = {
     }
 }
 
-# Base hint templates for each piece type (keeping original)
-base_hint_templates = { 
-    "Pawn": [
-        "2.3 Consider advancing this pawn to control the center.",
-        "2.5 Use this pawn to support other pieces.",
-        "1.8 Push the pawn to create a stronghold for your attack.",
-        "3.1 Place this pawn in front of your king for protection.",
-        "2.2 Advance the pawn to block the opponent's pieces.",
-        "2.7 Use this pawn to gain space on the queenside.",
-        "2.1 Push the pawn to gain tempo in your development.",
-        "1.9 Consider a pawn push to open up the game.",
-        "2.4 Place the pawn where it can restrict the opponent's knight.",
-        "2.6 Consider advancing the pawn to challenge the opponent's center.",
-        "2.8 Place the pawn where it can control a key square in the center.",
-        "3.0 Push the pawn to create a passed pawn in the endgame.",
-        "2.1 Move the pawn to limit the movement of your opponent's pieces.",
-        "2.3 Consider pushing the pawn to initiate an attack on the flank.",
-        "2.6 Use this pawn to defend against an incoming attack.",
-    ],
-    "Rook": [
-        "3.1 Move the rook to an open file to maximize control.",
-        "2.8 Use the rook to attack opponent's weak pawns.",
-        "2.5 Consider doubling your rooks on an open file.",
-        "3.0 Position your rook on the seventh rank to create pressure.",
-        "2.7 Activate the rook to attack the opponent's back rank.",
-        "2.4 Position your rook to support your central pawns.",
-        "2.9 Keep your rook on an open file to limit the opponent's options.",
-        "2.6 Place the rook behind your passed pawn to support its advancement.",
-        "2.8 Use the rook to cut off the opponent's king from the center.",
-        "2.3 Place the rook to defend your own king while attacking.",
-        "3.1 Keep your rook active to control open lines and ranks.",
-        "2.5 Use the rook to protect your pieces while launching a counterattack.",
-        "2.9 Consider placing the rook in a strong defensive position to support your king.",
-        "2.7 Keep the rook centralized to control more of the board.",
-        "2.4 Use the rook in coordination with other pieces for a checkmate threat.",
-    ],
-    "Knight": [
-        "3.2 Move the knight to fork two opponent pieces.",
-        "2.6 Place the knight on a central square for more control.",
-        "2.3 Consider moving the knight to protect other pieces.",
-        "2.8 Position your knight to control the center of the board.",
-        "2.9 Place the knight on a square where it can attack key squares.",
-        "2.4 Keep the knight close to the king for extra defense.",
-        "3.1 Move the knight to attack undefended pieces.",
-        "2.7 Position the knight to control key diagonal squares.",
-        "2.5 Use the knight to protect pawns in the center.",
-        "2.2 Consider a knight jump to create a tactical threat.",
-        "2.9 Place the knight where it can threaten your opponent's back rank.",
-        "2.6 Move the knight to a position where it can attack your opponent's pawns.",
-        "3.0 Use the knight to create a double attack on your opponent's pieces.",
-        "2.8 Consider a knight maneuver to create a check or fork.",
-        "2.4 Place the knight in an advanced position to gain more space.",
-    ],
-    "Bishop": [
-        "3.1 Consider moving the bishop to control long diagonals.",
-        "2.7 Place the bishop on an open diagonal for flexibility.",
-        "2.5 Move the bishop to pin an opponent's knight.",
-        "2.9 Use the bishop to control the center from a distance.",
-        "2.4 Place the bishop on a light square to support your pawn structure.",
-        "2.8 Place the bishop where it can attack the opponent's pawns.",
-        "2.6 Use the bishop to defend against opponent's piece attacks.",
-        "2.3 Position your bishop to support a kingside attack.",
-        "3.0 Move the bishop to an open diagonal to control more space.",
-        "2.7 Consider the bishop as a long-term defender in the endgame.",
-        "2.9 Use the bishop to restrict your opponent's king's mobility.",
-        "2.5 Move the bishop to a position where it can pin your opponent's pieces.",
-        "2.8 Position the bishop to control multiple squares on the board.",
-        "2.4 Consider using the bishop to control both sides of the board.",
-        "2.6 Place the bishop where it can protect your pawns from attacks.",
-    ],
-    "Queen": [
-        "3.2 Move the queen to support your other pieces.",
-        "2.1 Avoid bringing the queen out too early in the game.",
-        "2.7 Consider placing the queen on an open diagonal.",
-        "2.9 Position the queen to control both the center and the flank.",
-        "3.0 Use the queen to threaten the opponent's back rank.",
-        "2.5 Coordinate your queen with the rooks to increase pressure.",
-        "2.8 Move the queen to help create a checkmate threat.",
-        "2.3 Position the queen to support a pawn promotion.",
-        "2.6 Use the queen to restrict the opponent's king's mobility.",
-        "3.1 Keep the queen active in the center to control key squares.",
-        "2.4 Position the queen to support a kingside attack.",
-        "2.7 Move the queen to a square where it can defend your pawns.",
-        "2.9 Consider placing the queen on a long-range diagonal to control space.",
-        "2.5 Use the queen to create a tactical threat with your knights or rooks.",
-        "3.0 Keep the queen near the center to maximize its influence.",
-    ],
-    "King": [
-        "2.8 Castle early to secure your king.",
-        "3.1 Move the king to safety during the endgame.",
-        "2.5 Keep the king shielded by pawns.",
-        "2.9 In the endgame, activate the king to support pawn advancement.",
-        "2.7 Use the king to support your pieces in the late game.",
-        "2.6 Move the king toward the center in the endgame for more mobility.",
-        "2.3 Position the king away from the edge to avoid attacks.",
-        "2.8 Consider a king maneuver to help control the center.",
-        "3.0 Ensure the king is well defended as the opponent launches an attack.",
-        "2.4 Place the king in a safe, defended position during the middle game.",
-        "2.7 Move the king to a corner where it can be protected by pawns.",
-        "2.9 Keep the king close to your advanced pawns to support their promotion.",
-        "2.5 Avoid placing the king on open ranks to reduce attack vulnerability.",
-        "2.8 Consider positioning the king in the center during the late game for more mobility.",
-        "2.6 Place the king where it can easily escape if the opponent initiates a checkmate threat.",
-    ]
-}
-
 def display_progress_indicator(current_step):
     """Display a visual progress indicator"""
     steps = ["Mode", "Setup", "Results"]
@@ -704,6 +619,23 @@ def show_perspective_selection_page():
             }
             
             st.info(depth_info[depth])
+            
+            # Optional wall-clock budget: the search deepens up to the chosen depth
+            # and returns the best move found when time runs out
+            use_time_budget = st.checkbox(
+                "Limit analysis time",
+                value=False,
+                help="Stop searching after a fixed time instead of always finishing the full depth"
+            )
+            time_ms = None
+            if use_time_budget:
+                time_ms = st.slider(
+                    "Time Budget (ms)",
+                    min_value=250,
+                    max_value=10000,
+                    value=2000,
+                    step=250
+                )
         
         # Enhanced Analyze button
         if (st.session_state.uploaded_image is not None or st.session_state.selected_image_path is not None):
@@ -715,7 +647,7 @@ def show_perspective_selection_page():
                 if st.button("🔍 Start Analysis", key="analyze_btn", use_container_width=True, type="primary"):
                     with st.spinner("🤖 Analyzing position..."):
                         st.session_state.page = 'analysis_results'
-                        process_analysis(depth)
+                        process_analysis(depth, time_ms)
                     st.rerun()
         else:
             st.markdown("""
@@ -727,9 +659,7 @@ def show_perspective_selection_page():
 def load_image():
     """Load image from either uploaded file or default path"""
     if st.session_state.uploaded_image is not None:
-        file_bytes = np.asarray(bytearray(st.session_state.uploaded_image.read()), dtype=np.uint8)
-        img = cv.imdecode(file_bytes, cv.IMREAD_COLOR)
-        return img
+        return board_vision.load_image(st.session_state.uploaded_image.getvalue())
     elif st.session_state.selected_image_path is not None:
         if os.path.exists(st.session_state.selected_image_path):
             img = cv.imread(st.session_state.selected_image_path)
@@ -741,6 +671,15 @@ def load_image():
             return create_placeholder_chessboard()
     return None
 
+def load_image_bytes():
+    """Encoded bytes of the selected image, the key for cached recognition; None for the placeholder"""
+    if st.session_state.uploaded_image is not None:
+        return st.session_state.uploaded_image.getvalue()
+    elif st.session_state.selected_image_path is not None and os.path.exists(st.session_state.selected_image_path):
+        with open(st.session_state.selected_image_path, 'rb') as f:
+            return f.read()
+    return None
+
 def create_placeholder_chessboard():
     """Create a placeholder chessboard image for demonstration"""
     img = np.zeros((800, 800, 3), dtype=np.uint8)
@@ -760,34 +699,81 @@ def create_placeholder_chessboard():
     
     return img
 
-def process_analysis(depth):
+def image_identity(image_bytes):
+    """Session key for the selected image: a digest of its bytes, or the path behind a placeholder"""
+    if image_bytes is not None:
+        return hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+    return f"placeholder:{st.session_state.selected_image_path}"
+
+def recognize_selected_image():
+    """Image, FEN, piece lists and crops for the selected image, recognized once per distinct image"""
+    image_bytes = load_image_bytes()
+    key = image_identity(image_bytes)
+    recognition = st.session_state.recognition
+    if recognition is not None and recognition['key'] == key:
+        return recognition
+
+    img = load_image()
+    if img is None:
+        return None
+    fen, white_pieces, black_pieces, detected_pieces = process_chessboard(img, image_bytes)
+    recognition = {
+        'key': key,
+        'img': img,
+        'fen': fen,
+        'white_pieces': white_pieces,
+        'black_pieces': black_pieces,
+        'detected_pieces': detected_pieces,
+    }
+    if fen:
+        st.session_state.recognition = recognition
+    return recognition
+
+def search_position(fen, perspective, depth, time_ms=None):
+    """Engine result for the recognized position, reused when the same settings come back"""
+    key = (fen, perspective, depth, time_ms)
+    results = st.session_state.search_results
+    result = results.get(key)
+    if result is None:
+        # One engine call serves both modes, searching for the chosen side;
+        # positions analysed before come from the on-disk cache
+        board = board_for_perspective(chess.Board(fen), perspective)
+        result = analysis_cache.best_move(board, {'depth': depth, 'time_ms': time_ms})
+        results[key] = result
+        while len(results) > SEARCH_CACHE_SIZE:
+            del results[next(iter(results))]
+    return result
+
+def process_analysis(depth, time_ms=None):
     """Process the chess analysis"""
     try:
-        img = load_image()
-        if img is None:
+        # Changing only the depth, time budget or perspective skips straight to the search
+        recognition = recognize_selected_image()
+        if recognition is None:
             st.error("Could not load image")
             return
         
-        fen, white_pieces, black_pieces, detected_pieces = process_chessboard(img)
+        fen = recognition['fen']
         
         if fen:
             try:
                 st.session_state.fen = fen
                 st.session_state.board = chess.Board(fen)
                 
+                result = search_position(fen, st.session_state.perspective, depth, time_ms)
+                
                 if st.session_state.selected_mode == "best_move":
-                    best_move = find_best_move(st.session_state.board, depth, st.session_state.perspective)
-                    st.session_state.best_move = best_move
+                    st.session_state.best_move = result['move']
                 
                 elif st.session_state.selected_mode == "hint":
-                    hint = get_hint_from_best_move(st.session_state.board, depth, st.session_state.perspective)
+                    hint = get_hint_from_best_move(st.session_state.board, result)
                     st.session_state.hint = hint
                 
                 # Store analysis results
-                st.session_state.white_pieces = white_pieces
-                st.session_state.black_pieces = black_pieces
-                st.session_state.detected_pieces = detected_pieces
-                st.session_state.original_img = img
+                st.session_state.white_pieces = recognition['white_pieces']
+                st.session_state.black_pieces = recognition['black_pieces']
+                st.session_state.detected_pieces = recognition['detected_pieces']
+                st.session_state.original_img = recognition['img']
                 
             except ValueError as e:
                 st.error(f"Invalid FEN notation generated: {e}")
@@ -824,6 +810,9 @@ def show_analysis_results():
     
     st.markdown("---")
     
+    # Say so when a classifier fell back to its defaults instead of a model
+    show_model_status()
+    
     # Display results based on mode
     if hasattr(st.session_state, 'original_img'):
         display_enhanced_results(
@@ -845,340 +834,99 @@ def show_analysis_results():
         """, unsafe_allow_html=True)
 
 # Chess analysis functions (keeping all original functions)
-def detect_piece_in_square(img_block):
-    gray = cv.cvtColor(img_block, cv.COLOR_RGB2GRAY)
-    blurred = cv.GaussianBlur(gray, (5, 5), 0)
-    edges = cv.Canny(blurred, 50, 150)
-    kernel = np.ones((5, 5), np.uint8)
-    edges = cv.morphologyEx(edges, cv.MORPH_CLOSE, kernel)
-    contours, _ = cv.findContours(edges, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
-
-    piece_color = None
-    for contour in contours:
-        area = cv.contourArea(contour)
-        if area > 500:
-            square_color = determine_square_color_from_image(img_block)
-            piece_color = classify_piece_color(img_block, square_color)
-            return True, img_block, piece_color
-
-    return False, None, None
+def classify_using_model(img_blocks):
+    # Color model pass over the squares the HSV pixel counts couldn't decide
+    if load_your_model() is None:
+        return ['White'] * len(img_blocks), np.full(len(img_blocks), 0.5)  # Default fallback
+    return board_vision.classify_color_batch(img_blocks, load_your_model)
 
-def determine_square_color_from_image(img_block):
-    average_color = cv.mean(img_block)[:3]
-    average_intensity = sum(average_color) / len(average_color)
-    return 'Black' if average_intensity < 127 else 'White'
+@st.cache_resource(show_spinner="Loading model...")
+def cached_predictor(path):
+    # Held once per server process rather than looked up on every rerun
+    return model_registry.get_predictor(path)
 
-def classify_piece_color(img_block, square_color):
-    hsv = cv.cvtColor(img_block, cv.COLOR_RGB2HSV)
-    lower_black = np.array([0, 0, 0])
-    upper_black = np.array([180, 255, 50])
-    lower_white = np.array([0, 0, 200])
-    upper_white = np.array([180, 25, 255])
-    black_mask = cv.inRange(hsv, lower_black, upper_black)
-    white_mask = cv.inRange(hsv, lower_white, upper_white)
-    black_count = cv.countNonZero(black_mask)
-    white_count = cv.countNonZero(white_mask)
-
-    if white_count >= 2 * black_count:
-        return 'White'
-    elif black_count >= 2 * white_count:
-        return 'Black'
-    return classify_using_model(img_block)
-
-def classify_using_model(img_block):
-    try:
-        preprocessed_img = preprocess_for_model(img_block)
-        model = load_your_model()
-        if model:
-            prediction = model.predict(preprocessed_img)
-            return interpret_prediction(prediction)
-    except:
-        pass
-    return 'White'  # Default fallback
-
-def preprocess_for_model(img):
-    resized_img = cv.resize(img, (224, 224))
-    normalized_img = resized_img / 255.0
-    return np.expand_dims(normalized_img, axis=0)
-
-def load_your_model():
-    try:
-        return load_model(r'https://drive.google.com/file/d/1GhZpHqWBIzUG2psayZOK9mdsK0osuWSJ/view?usp=sharing')
-    except:
+def load_model_or_none(path):
+    # A missing or broken model is only tried once per process (model_registry
+    # remembers the failure), so the fallback check is cheap on every board
+    if not model_registry.is_available(path):
         return None
+    return cached_predictor(path)
 
-def interpret_prediction(prediction):
-    return 'White' if prediction[0][0] > 0.5 else 'Black'
+def load_your_model():
+    return load_model_or_none(COLOR_MODEL_PATH)
 
 def preprocess_input_image(img):
     img = cv.cvtColor(img, cv.COLOR_BGR2RGB)
-    height, width, _ = img.shape
-    square_size = height // 8
-    img_blocks = []
-
-    for i in range(8):
-        for j in range(8):
-            square = img[i * square_size:(i + 1) * square_size, j * square_size:(j + 1) * square_size]
-            img_blocks.append(square)
-
-    return img_blocks
+    # (8, 8, S, S, 3) view of the squares, indexed [row, column] from a8
+    return board_vision.tile_board(img)
 
 def classify_piece_name(img_block):
-    try:
-        model = load_your_piece_model()
-        if model is None:
-            return 'pawn'
-        resized_img_block = cv.resize(img_block, (85, 85))
-        preprocessed_img = resized_img_block.astype("float32") / 255.0
-        preprocessed_img = np.expand_dims(preprocessed_img, axis=0)
-        prediction = model.predict(preprocessed_img)
-        return interpret_piece_prediction(prediction)
-    except:
-        return 'pawn'
+    piece_names, _ = classify_piece_names([img_block])
+    return piece_names[0]
 
-def load_your_piece_model():
-    try:
-        return load_model(r'https://drive.google.com/file/d/11Dxh6WoB2xqHquRVLatP67bCy6ZCRV24/view?usp=sharing')
-    except:
-        return None
+def classify_piece_names(img_blocks):
+    # One model.predict call for all occupied squares on the board; a missing
+    # model (load_your_piece_model returned None) falls back to 'pawn'
+    if load_your_piece_model() is None:
+        return ['pawn'] * len(img_blocks), None
+    return board_vision.classify_piece_batch(img_blocks, load_your_piece_model)
 
-def interpret_piece_prediction(prediction):
-    piece_index = np.argmax(prediction)
-    piece_classes = ['bishop', 'king', 'knight', 'pawn', 'queen', 'rook']
-    return piece_classes[piece_index]
+def recognize_squares(img_blocks):
+    # (index, color, color confidence, piece, piece confidence) for each occupied square
+    return board_vision.recognize_squares(img_blocks, classify_using_model, classify_piece_names)
 
-def generate_fen(detected_pieces):
-    board = [['' for _ in range(8)] for _ in range(8)]
-    piece_to_fen = {
-        'pawn': 'P', 'knight': 'N', 'bishop': 'B', 'rook': 'R', 'queen': 'Q', 'king': 'K'
-    }
-    
-    for position, _, color, piece_name in detected_pieces:
-        col = ord(position[0]) - ord('a')
-        row = 8 - int(position[1])
-        fen_char = piece_to_fen[piece_name.lower()]
-        board[row][col] = fen_char.upper() if color == "White" else fen_char.lower()
-    
-    fen_parts = []
-    for row in board:
-        empty = 0
-        row_fen = ''
-        for cell in row:
-            if cell == '':
-                empty += 1
-            else:
-                if empty > 0:
-                    row_fen += str(empty)
-                    empty = 0
-                row_fen += cell
-        if empty > 0:
-            row_fen += str(empty)
-        fen_parts.append(row_fen)
-    
-    fen = '/'.join(fen_parts)
-    fen += " w KQkq - 0 1"
-    
-    return fen
+def load_your_piece_model():
+    return load_model_or_none(PIECE_MODEL_PATH)
 
-def evaluate_board(board):
-    material_values = {
-        chess.PAWN: 1, chess.KNIGHT: 3, chess.BISHOP: 3,
-        chess.ROOK: 5, chess.QUEEN: 9, chess.KING: 0
+def model_status():
+    """For each classifier, whether the real model or its fallback is in use"""
+    return {
+        name: {'path': path, 'active': model_registry.is_available(path), 'status': model_registry.status(path)}
+        for name, path in (('Piece', PIECE_MODEL_PATH), ('Color', COLOR_MODEL_PATH))
     }
-    score = 0
-    for piece_type in material_values:
-        score += len(board.pieces(piece_type, chess.WHITE)) * material_values[piece_type]
-        score -= len(board.pieces(piece_type, chess.BLACK)) * material_values[piece_type]
-    return score
-
-def minimax(board, depth, alpha, beta, is_maximizing_player):
-    if depth == 0 or board.is_game_over():
-        return evaluate_board(board)
-
-    if is_maximizing_player:
-        max_eval = -float('inf')
-        for move in board.legal_moves:
-            board.push(move)
-            eval = minimax(board, depth - 1, alpha, beta, False)
-            board.pop()
-            max_eval = max(max_eval, eval)
-            alpha = max(alpha, eval)
-            if beta <= alpha:
-                break
-        return max_eval
-    else:
-        min_eval = float('inf')
-        for move in board.legal_moves:
-            board.push(move)
-            eval = minimax(board, depth - 1, alpha, beta, True)
-            board.pop()
-            min_eval = min(min_eval, eval)
-            beta = min(beta, eval)
-            if beta <= alpha:
-                break
-        return min_eval
-
-def find_best_move(board, depth, perspective):
-    best_move = None
-    if perspective == "White":
-        best_value = -float('inf')
-    else:
-        best_value = float('inf')
-    
-    alpha = -float('inf')
-    beta = float('inf')
-
-    for move in board.legal_moves:
-        board.push(move)
-        board_value = minimax(board, depth - 1, alpha, beta, perspective == "Black")
-        board.pop()
 
-        if perspective == "White":
-            if board_value > best_value:
-                best_value = board_value
-                best_move = move
-        else:
-            if board_value < best_value:
-                best_value = board_value
-                best_move = move
-    
-    return best_move
-
-def get_hint_from_best_move(board, depth, perspective):
-    best_move = None
-    if perspective == "White":
-        best_value = -float('inf')
-        alpha = -float('inf')
-        beta = float('inf')
-        
-        for move in board.legal_moves:
-            board.push(move)
-            board_value = minimax(board, depth - 1, alpha, beta, False)
-            board.pop()
-            
-            if board_value > best_value:
-                best_value = board_value
-                best_move = move
-    else:
-        best_value = float('inf')
-        alpha = -float('inf')
-        beta = float('inf')
-        
-        for move in board.legal_moves:
-            board.push(move)
-            board_value = -minimax(board, depth - 1, alpha, beta, True)
-            board.pop()
-            
-            if board_value < best_value:
-                best_value = board_value
-                best_move = move
-
-    if best_move:
-        piece_type = board.piece_type_at(best_move.from_square)
-        piece_name = chess.piece_name(piece_type).capitalize()
-
-        if piece_name in base_hint_templates:
-            if best_value < -3 or best_value > 3:
-                hint = random.choice(base_hint_templates[piece_name])
-            else:
-                hint_index = int((best_value + 4) // 0.5)
-                hint_index = max(0, min(hint_index, len(base_hint_templates[piece_name]) - 1))
-                hint = base_hint_templates[piece_name][hint_index]
-        else:
-            hint = "Think about developing or positioning your pieces."
-
-        hint += f" (Evaluation: {best_value:.2f})"
-        return hint
-    return "No valid move found."
-
-def get_square_image(img, square):
-    file, rank = chess.square_file(square), chess.square_rank(square)
-    height, width, _ = img.shape
-    square_size = height // 8
-    y = (7 - rank) * square_size
-    x = file * square_size
-    return img[y:y+square_size, x:x+square_size]
-
-def put_square_image(img, square, square_img):
-    file, rank = chess.square_file(square), chess.square_rank(square)
-    height, width, _ = img.shape
-    square_size = height // 8
-    y = (7 - rank) * square_size
-    x = file * square_size
-    img[y:y+square_size, x:x+square_size] = square_img
-
-def extract_piece(img):
-    gray = cv.cvtColor(img, cv.COLOR_BGR2GRAY)
-    _, thresh = cv.threshold(gray, 0, 255, cv.THRESH_BINARY_INV + cv.THRESH_OTSU)
-    contours, _ = cv.findContours(thresh, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
-    if contours:
-        mask = np.zeros(img.shape[:2], np.uint8)
-        cv.drawContours(mask, contours, -1, (255), thickness=cv.FILLED)
-        result = cv.bitwise_and(img, img, mask=mask)
-        return result
-    return img
+def show_model_status():
+    for name, info in model_status().items():
+        if not info['active']:
+            st.markdown(f"""
+            <div class="status-warning">
+                ⚠️ {name} model unavailable ({info['status']}); using the fallback classifier.
+                Download it into the '{model_registry.MODEL_DIR}' folder to enable it.
+            </div>
+            """, unsafe_allow_html=True)
 
-def get_empty_square(img, is_white):
-    height, width, _ = img.shape
-    square_size = height // 8
-    color = (240, 217, 181) if is_white else (181, 136, 99)
-    return np.full((square_size, square_size, 3), color, dtype=np.uint8)
+def board_for_perspective(board, perspective):
+    # The FEN from the image always says White to move; search for the chosen side instead
+    board = board.copy(stack=False)
+    board.turn = chess.WHITE if perspective == "White" else chess.BLACK
+    return board
 
-def determine_chess_square_color(square):
-    file, rank = chess.square_file(square), chess.square_rank(square)
-    return (file + rank) % 2 == 0
+def get_hint_from_best_move(board, result):
+    return hints.hint_from_result(board, result, fallback="Think about developing or positioning your pieces.",
+                                  suffix=f" (Evaluation: {result['score'] / 100:.2f})")
 
-def apply_move_to_image(img, move):
-    from_square = move.from_square
-    to_square = move.to_square
-    
-    from_img = get_square_image(img, from_square)
-    to_img = get_square_image(img, to_square)
-    
-    from_is_white = determine_chess_square_color(from_square)
-    to_is_white = determine_chess_square_color(to_square)
-    
-    piece_img = extract_piece(from_img)
-    
-    empty_to_square = get_empty_square(img, to_is_white)
-    put_square_image(img, to_square, empty_to_square)
-    
-    put_square_image(img, to_square, cv.addWeighted(empty_to_square, 0.5, piece_img, 0.5, 0))
-    
-    empty_from_square = get_empty_square(img, from_is_white)
-    put_square_image(img, from_square, empty_from_square)
-    
-    return img
+@st.cache_data(max_entries=RECOGNITION_CACHE_SIZE, show_spinner=False)
+def recognize_image(image_bytes, _img_blocks):
+    # Keyed on the image bytes only, so switching mode or perspective on the
+    # same image reuses the labels instead of running the models again
+    return recognition_cache.recognize(_img_blocks, recognize_squares)
 
-def process_chessboard(img):
+def process_chessboard(img, image_bytes=None):
     try:
         img_blocks = preprocess_input_image(img)
     except ValueError as e:
         st.error(f"Error: {e}")
         return None, [], [], []
 
-    detected_pieces = []
-    white_pieces = []
-    black_pieces = []
-    columns = 'abcdefgh'
-    rows = range(8, 0, -1)
-
-    for i, img_block in enumerate(img_blocks):
-        piece_present, piece_image, piece_color = detect_piece_in_square(img_block)
-        if piece_present:
-            resized_piece_image = cv.resize(piece_image, (85, 85))
-            piece_name = classify_piece_name(resized_piece_image)
-            column = columns[i % 8]
-            row = rows[i // 8]
-            square_position = f"{column}{row}"
-            detected_pieces.append((square_position, resized_piece_image, piece_color, piece_name))
-            piece_info = f"{piece_name}-{square_position}"
-            if piece_color == "White":
-                white_pieces.append(piece_info)
-            else:
-                black_pieces.append(piece_info)
+    # Repeat and near-duplicate boards get their labels from the recognition
+    # cache without running the models
+    if image_bytes is not None:
+        labels = recognize_image(image_bytes, img_blocks)
+    else:
+        labels = recognition_cache.recognize(img_blocks, recognize_squares)
+    detected_pieces, white_pieces, black_pieces = board_pipeline.detect_pieces(img_blocks, labels)
 
-    fen = generate_fen(detected_pieces)
+    fen = board_pipeline.generate_fen(detected_pieces)
     return fen, white_pieces, black_pieces, detected_pieces
 
 def display_enhanced_results(original_img, fen, white_pieces, black_pieces, detected_pieces, mode, perspective, best_move=None, hint=None):
@@ -1204,7 +952,7 @@ def display_enhanced_results(original_img, fen, white_pieces, black_pieces, dete
             st.markdown('</div>', unsafe_allow_html=True)
             
         with col2:
-            moved_img = apply_move_to_image(original_img.copy(), best_move)
+            moved_img = board_pipeline.apply_move_to_image(original_img.copy(), best_move)
             st.markdown('<div class="image-container">', unsafe_allow_html=True)
             st.image(moved_img, caption=f"✅ After Best Move: {best_move}", use_column_width=True)
             st.markdown('</div>', unsafe_allow_html=True)
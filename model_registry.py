@@ -0,0 +1,155 @@
+import logging
+import os
+import threading
+from tensorflow.keras.models import load_model
+from inference_batcher import MicroBatcher
+
+# Process-wide cache of loaded Keras models, keyed by model path.
+# Every module used to call load_model() once per square; going through
+# get_model() deserializes each .h5 file at most once per process.
+# Failed loads are remembered too, so a missing model costs one attempt
+# per process instead of one per square.
+_models = {}
+_failures = {}
+_batchers = {}
+_lock = threading.Lock()
+log = logging.getLogger(__name__)
+
+# Where resolve_model_path() looks for model files by name
+MODEL_DIR = os.environ.get('CHESS_MODEL_DIR', 'models')
+
+
+class ModelUnavailable(RuntimeError):
+    """Raised by get_model() for a path that could not be loaded"""
+
+
+def resolve_model_path(filename, configured=None, search_dirs=None):
+    """
+    Local path of a model file: `configured` if it exists, otherwise the first
+    of MODEL_DIR, the working directory and this file's directory that holds
+    `filename`. Returns None when no copy is found; URLs are never loaded.
+    """
+    if configured and os.path.isfile(configured):
+        return configured
+    if search_dirs is None:
+        search_dirs = (MODEL_DIR, os.getcwd(), os.path.dirname(os.path.abspath(__file__)))
+    for folder in search_dirs:
+        path = os.path.join(folder, filename)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def get_model(path):
+    """Return the model stored at `path`, loading it on first use"""
+    path = str(path)
+    model = _models.get(path)
+    if model is not None:
+        return model
+    if path in _failures:
+        raise ModelUnavailable(f"Model {path} could not be loaded: {_failures[path]}")
+
+    with _lock:
+        # Another thread may have finished loading while we waited on the lock
+        model = _models.get(path)
+        if model is None:
+            if path in _failures:
+                raise ModelUnavailable(f"Model {path} could not be loaded: {_failures[path]}")
+            try:
+                model = load_model(path)
+            except Exception as e:
+                _failures[path] = str(e)
+                log.warning("Could not load model %s: %s", path, e)
+                raise ModelUnavailable(f"Model {path} could not be loaded: {e}") from e
+            _models[path] = model
+    return model
+
+
+def is_available(path):
+    """Whether the model at `path` loads; tries it once if it hasn't been tried yet"""
+    if path is None:
+        return False
+    try:
+        get_model(path)
+    except ModelUnavailable:
+        return False
+    return True
+
+
+def status(path):
+    """'loaded', 'failed' (with the error), 'missing' for None, or 'not loaded' if never tried"""
+    if path is None:
+        return 'missing'
+    path = str(path)
+    if path in _models:
+        return 'loaded'
+    if path in _failures:
+        return f"failed: {_failures[path]}"
+    return 'not loaded'
+
+
+def batching_enabled():
+    """Cross-request micro-batching is on unless CHESS_MICRO_BATCHING is set to 0/false/no"""
+    return os.environ.get('CHESS_MICRO_BATCHING', '1').lower() not in ('0', 'false', 'no')
+
+
+def get_predictor(path):
+    """
+    What the model loaders hand to board_vision: the model at `path` behind a
+    shared MicroBatcher, so concurrent requests are coalesced into one
+    predict, or the bare model when batching is disabled.
+    """
+    if not batching_enabled():
+        return get_model(path)
+    path = str(path)
+    batcher = _batchers.get(path)
+    # A batcher inherited through fork has no inference thread behind it
+    if batcher is not None and batcher.pid == os.getpid():
+        return batcher
+
+    model = get_model(path)
+    with _lock:
+        batcher = _batchers.get(path)
+        if batcher is None or batcher.pid != os.getpid():
+            batcher = MicroBatcher(model, name=os.path.basename(path))
+            _batchers[path] = batcher
+    return batcher
+
+
+def batching_stats():
+    """Batch-size distribution of every micro-batched model, keyed by path"""
+    return {path: batcher.stats() for path, batcher in list(_batchers.items())}
+
+
+def warm_up(paths):
+    """Load every model in `paths` up front, returning the paths that failed"""
+    failed = []
+    for path in paths:
+        try:
+            get_model(path)
+        except ModelUnavailable:
+            failed.append(str(path))
+    return failed
+
+
+def warm_up_enabled():
+    """Eager loading at import/app start is opt-in through CHESS_WARMUP_MODELS"""
+    return os.environ.get('CHESS_WARMUP_MODELS', '').lower() in ('1', 'true', 'yes')
+
+
+def _after_fork():
+    # The child gets copies of the batchers but not their threads, and the
+    # lock may have been held by another thread at the time of the fork
+    global _lock
+    _lock = threading.Lock()
+    _batchers.clear()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def clear():
+    with _lock:
+        _models.clear()
+        _failures.clear()
+        _batchers.clear()
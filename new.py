@@ -1,26 +1,67 @@
 
 from flask import Flask, request, render_template, send_from_directory, url_for, redirect 
 import os
+import base64
 import subprocess
 from White_Best_Move import process_and_move as process_white_move
 from Black_Best_Move import process_and_move as process_black_move
+import White_Best_Move
+import Black_Best_Move
+import model_registry
+import search_engine
+import debug
+from api import api
 from white_hint import process_chessboard
 from white_hint import get_hint_from_best_move
+import white_hint
 import chess
 
 # Initialize the Flask app and specify the template folder
 app = Flask(__name__, template_folder=r"D:\Projects\Machine_learning\website\template")
 
-# Paths to save uploaded images and results
-UPLOAD_FOLDER = r"D:\Projects\Machine_learning\website\uploads"
+# Path to save result images; uploads are processed in memory
 RESULTS_FOLDER = r"D:\Projects\Machine_learning\website\results"
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['RESULTS_FOLDER'] = RESULTS_FOLDER
 
-# Ensure that the results and upload directories exist
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Search limits: the search deepens up to SEARCH_DEPTH but stops after
+# SEARCH_TIME_MS so slow boards can't hold a worker past its timeout.
+# Requests may ask for less of either, never more.
+app.config['SEARCH_DEPTH'] = int(os.environ.get('SEARCH_DEPTH', 4))
+app.config['SEARCH_TIME_MS'] = int(os.environ.get('SEARCH_TIME_MS', 5000))
+# Processes to split each search across (0 = every core, 1 = in-process).
+# The pool serves one search at a time; concurrent requests wait their turn.
+app.config['SEARCH_WORKERS'] = int(os.environ.get('SEARCH_WORKERS', 1))
+# Background analyses (/api/jobs): warm worker processes, how many jobs may
+# wait or run at once before new ones are refused, and the per-job timeout
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))
+app.config['JOB_QUEUE_DEPTH'] = int(os.environ.get('JOB_QUEUE_DEPTH', 32))
+app.config['JOB_TIMEOUT_S'] = float(os.environ.get('JOB_TIMEOUT_S', 60))
+
+# Ensure that the results directory exists
 os.makedirs(RESULTS_FOLDER, exist_ok=True)
 
+# JSON analysis API under /api
+app.register_blueprint(api)
+
+# Search and job worker processes are spawned, so they re-import this script
+# as __mp_main__; only the server process sets up logging and loads the models
+if __name__ != '__mp_main__':
+    # Warnings only unless CHESS_DEBUG asks for the diagnostic logs and images
+    debug.configure_logging()
+    # Load the classification models once at startup instead of on the first request
+    model_registry.warm_up(White_Best_Move.MODEL_PATHS + Black_Best_Move.MODEL_PATHS + white_hint.MODEL_PATHS)
+
+def search_limits():
+    """Engine limits for this request: the form may ask for less than SEARCH_DEPTH/SEARCH_TIME_MS, never more"""
+    limits = search_engine.capped_limits(request.form.get('depth', type=int), request.form.get('time_ms', type=int),
+                                         app.config['SEARCH_DEPTH'], app.config['SEARCH_TIME_MS'])
+    limits['workers'] = app.config['SEARCH_WORKERS']
+    return limits
+
+def image_data_uri(image_bytes, mimetype):
+    """Inline the upload in the page instead of writing it out to be served back"""
+    return f"data:{mimetype or 'image/png'};base64,{base64.b64encode(image_bytes).decode('ascii')}"
+
 def allowed_file(filename):
     """Check if the uploaded file has an allowed extension"""
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
@@ -56,13 +97,13 @@ def run_white():
         return render_template('front.html', error="Invalid file type. Please upload a PNG or JPG image.")
     
     try:
-        # Generate a unique filename to prevent overwrites
-        filename = f"upload_{os.path.splitext(file.filename)[0]}_{os.urandom(4).hex()}.png"
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+        # Keep the upload in memory; the pipeline decodes the bytes once
+        image_bytes = file.read()
+        # Unique name for the result image to prevent overwrites
+        name = f"upload_{os.path.splitext(file.filename)[0]}_{os.urandom(4).hex()}"
         
         # Process the image
-        best_move, result_image_filename = process_white_move(file_path, app.config['RESULTS_FOLDER'])
+        best_move, result_image_filename = process_white_move(image_bytes, app.config['RESULTS_FOLDER'], search_limits(), name)
         
         if best_move and result_image_filename:
             # Generate the URL for the result image
@@ -77,10 +118,6 @@ def run_white():
     except Exception as e:
         return render_template('front.html',
                             error=f"An error occurred: {str(e)}")
-    finally:
-        # Clean up uploaded file
-        if os.path.exists(file_path):
-            os.remove(file_path)
 
 @app.route('/run_black', methods=['POST'])
 def run_black():
@@ -95,13 +132,13 @@ def run_black():
         return render_template('front.html', error="Invalid file type. Please upload a PNG or JPG image.")
     
     try:
-        # Generate a unique filename to prevent overwrites
-        filename = f"upload_{os.path.splitext(file.filename)[0]}_{os.urandom(4).hex()}.png"
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+        # Keep the upload in memory; the pipeline decodes the bytes once
+        image_bytes = file.read()
+        # Unique name for the result image to prevent overwrites
+        name = f"upload_{os.path.splitext(file.filename)[0]}_{os.urandom(4).hex()}"
         
         # Process the image
-        best_move, result_image_filename = process_black_move(file_path, app.config['RESULTS_FOLDER'])
+        best_move, result_image_filename = process_black_move(image_bytes, app.config['RESULTS_FOLDER'], search_limits(), name)
         
         if best_move and result_image_filename:
             # Generate the URL for the result image
@@ -116,10 +153,6 @@ def run_black():
     except Exception as e:
         return render_template('front.html',
                             error=f"An error occurred: {str(e)}")
-    finally:
-        # Clean up uploaded file
-        if os.path.exists(file_path):
-            os.remove(file_path)
 
 
 @app.route('/run_white_hint', methods=['POST'])
@@ -135,33 +168,27 @@ def run_white_hint():
         return render_template('hint.html', error="Invalid file type. Please upload a PNG or JPG image.")
     
     try:
-        filename = f"upload_{os.path.splitext(file.filename)[0]}_{os.urandom(4).hex()}.png"
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+        # Keep the upload in memory; process_chessboard decodes the bytes once
+        image_bytes = file.read()
         
-        fen = process_chessboard(file_path)
+        fen = process_chessboard(image_bytes)
         
         if fen:
-            print(f"Processed FEN: {fen}")
+            app.logger.debug("Processed FEN: %s", fen)
             board = chess.Board(fen)
             
-            hint = get_hint_from_best_move(board, depth=4)
-            print(f"Hint: {hint}")
-            
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            hint = get_hint_from_best_move(board, search_limits(), app.config['RESULTS_FOLDER'])
+            app.logger.debug("Hint: %s", hint)
             
             # Pass both hint and uploaded_image_url to the template7
             return render_template('hint.html', 
                                 hint=hint,
-                                uploaded_image_url=url_for('send_result', filename=os.path.basename(file_path)),
+                                uploaded_image_url=image_data_uri(image_bytes, file.mimetype),
                                 success=True)
         else:
             return render_template('hint.html', error="Could not analyze the chessboard position.")
     
     except Exception as e:
-        if os.path.exists(file_path):
-            os.remove(file_path)
         return render_template('hint.html', error=f"An error occurred: {str(e)}")
 
 @app.route('/run_black_hint', methods=['POST'])
@@ -177,11 +204,10 @@ def run_black_hint():
         return render_template('hint.html', error="Invalid file type. Please upload a PNG or JPG image.")
     
     try:
-        filename = f"upload_{os.path.splitext(file.filename)[0]}_{os.urandom(4).hex()}.png"
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+        # Keep the upload in memory; process_chessboard decodes the bytes once
+        image_bytes = file.read()
         
-        fen = process_chessboard(file_path)
+        fen = process_chessboard(image_bytes)
         
         if fen:
             fen_parts = fen.split(' ')
@@ -189,22 +215,17 @@ def run_black_hint():
             fen = ' '.join(fen_parts)
             
             board = chess.Board(fen)
-            hint = get_hint_from_best_move(board, depth=4)
-            
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            hint = get_hint_from_best_move(board, search_limits(), app.config['RESULTS_FOLDER'])
             
             # Pass both hint and uploaded_image_url to the template
             return render_template('hint.html', 
                                 hint=hint,
-                                uploaded_image_url=url_for('send_result', filename=os.path.basename(file_path)),
+                                uploaded_image_url=image_data_uri(image_bytes, file.mimetype),
                                 success=True)
         else:
             return render_template('hint.html', error="Could not analyze the chessboard position.")
             
     except Exception as e:
-        if os.path.exists(file_path):
-            os.remove(file_path)
         return render_template('hint.html', error=f"An error occurred: {str(e)}")
 
 @app.route('/results/<filename>')
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import cv2 as cv
+import numpy as np
+import chess
+import board_vision
+
+# In-memory cache of board recognition results. A board is found either by
+# the hash of its exact pixels or, for re-encoded or slightly rescaled
+# screenshots, by a 128-bit difference hash of each of its 64 squares.
+MAX_ENTRIES = int(os.environ.get('CHESS_RECOGNITION_CACHE_SIZE', 256))
+# Neighbouring pixels must differ by more than this many gray levels to set a
+# hash bit, so compression noise on flat empty squares leaves the bits clear
+HASH_MARGIN = 8
+# Two boards are near-duplicates when no square's hash differs in more bits.
+# JPEG re-encoding and rescaling move a square by up to ~7 bits on the sample
+# boards; a different piece on a square moves it by 25+.
+MAX_SQUARE_DISTANCE = 10
+
+PIECE_SYMBOLS = {'pawn': 'p', 'knight': 'n', 'bishop': 'b', 'rook': 'r', 'queen': 'q', 'king': 'k'}
+
+
+def content_key(tiles):
+    """Hash of the exact board pixels behind a tiled board"""
+    board = np.ascontiguousarray(board_vision.board_from_tiles(tiles))
+    digest = hashlib.blake2b(board.tobytes(), digest_size=16)
+    digest.update(str(board.shape).encode())
+    return digest.hexdigest()
+
+
+def square_hashes(tiles):
+    """Difference hash of every square, packed into an (8, 8, 16) uint8 array"""
+    board = board_vision.board_from_tiles(tiles)
+    gray = cv.cvtColor(board, cv.COLOR_RGB2GRAY) if board.ndim == 3 else board
+    # 9x8 pixels per square: each row gives 8 left/right brightness steps,
+    # recorded as one bit for "brighter" and one for "darker"
+    small = cv.resize(gray, (8 * 9, 8 * 8), interpolation=cv.INTER_AREA).astype(np.int16)
+    squares = small.reshape(8, 8, 8, 9).swapaxes(1, 2)
+    steps = (squares[..., 1:] - squares[..., :-1]).reshape(8, 8, 64)
+    bits = np.concatenate([steps > HASH_MARGIN, steps < -HASH_MARGIN], axis=-1)
+    return np.packbits(bits, axis=-1)
+
+
+def square_distances(a, b):
+    """Per-square Hamming distance between two square_hashes() results"""
+    return np.unpackbits(a ^ b, axis=-1).sum(axis=-1)
+
+
+def placement_fen(labels):
+    """The piece-placement part of a FEN for recognize_squares() labels"""
+    board = chess.BaseBoard.empty()
+    for i, color, _, name, _ in labels:
+        symbol = PIECE_SYMBOLS[name.lower()]
+        board.set_piece_at(chess.square(i % 8, 7 - i // 8),
+                           chess.Piece.from_symbol(symbol.upper() if color == 'White' else symbol))
+    return board.board_fen()
+
+
+class RecognitionCache:
+    def __init__(self, max_entries=MAX_ENTRIES, max_distance=MAX_SQUARE_DISTANCE):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        # content key -> (square hashes, {'fen': ..., 'labels': ...}), oldest first
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def lookup(self, key, hashes):
+        with self.lock:
+            match = key if key in self.entries else None
+            if match is None:
+                for other, (other_hashes, _) in reversed(self.entries.items()):
+                    if square_distances(hashes, other_hashes).max() <= self.max_distance:
+                        match = other
+                        break
+            if match is None:
+                self.misses += 1
+                return None
+            if match == key:
+                self.hits += 1
+            else:
+                self.near_hits += 1
+            self.entries.move_to_end(match)
+            return self.entries[match][1]
+
+    def store(self, key, hashes, labels):
+        with self.lock:
+            self.entries[key] = (hashes, {'fen': placement_fen(labels), 'labels': labels})
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.near_hits = self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.near_hits + self.misses
+        return {
+            'hits': self.hits,
+            'near_hits': self.near_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.near_hits) / lookups if lookups else 0.0,
+            'entries': len(self.entries),
+        }
+
+
+default_cache = RecognitionCache()
+
+
+def recognize(tiles, recognize_fn, cache=None):
+    """
+    Labels for a tiled board from the cache, or from `recognize_fn(tiles)`
+    (normally a board_vision.recognize_squares call), which is then stored.
+    """
+    cache = default_cache if cache is None else cache
+    key = content_key(tiles)
+    hashes = square_hashes(tiles)
+    entry = cache.lookup(key, hashes)
+    if entry is None:
+        labels = recognize_fn(tiles)
+        cache.store(key, hashes, labels)
+        return labels
+    return entry['labels']
@@ -0,0 +1,75 @@
+import os
+import cv2 as cv
+import numpy as np
+
+# Headless before/after rendering: the comparison image is composed with
+# NumPy and OpenCV and encoded in memory, with no matplotlib figure behind it.
+BOARD_SIZE = int(os.environ.get('CHESS_RENDER_SIZE', 480))
+DEFAULT_FORMAT = os.environ.get('CHESS_RENDER_FORMAT', 'png').lower()
+DEFAULT_QUALITY = 90
+
+# Format name -> (file extension, OpenCV quality flag or None)
+FORMATS = {
+    'png': ('.png', None),
+    'jpeg': ('.jpg', cv.IMWRITE_JPEG_QUALITY),
+    'jpg': ('.jpg', cv.IMWRITE_JPEG_QUALITY),
+    'webp': ('.webp', cv.IMWRITE_WEBP_QUALITY),
+}
+
+BACKGROUND = (255, 255, 255)
+TEXT_COLOR = (0, 0, 0)
+FONT = cv.FONT_HERSHEY_SIMPLEX
+
+
+def extension(fmt=DEFAULT_FORMAT):
+    return FORMATS[fmt.lower()][0]
+
+
+def encode_image(img, fmt=DEFAULT_FORMAT, quality=DEFAULT_QUALITY):
+    """Encode a BGR image to PNG, JPEG or WebP bytes"""
+    if fmt.lower() not in FORMATS:
+        raise ValueError(f"Unsupported image format: {fmt}")
+    ext, quality_flag = FORMATS[fmt.lower()]
+    params = [quality_flag, int(quality)] if quality_flag is not None else []
+    ok, buffer = cv.imencode(ext, img, params)
+    if not ok:
+        raise ValueError(f"Could not encode the image as {fmt}")
+    return buffer.tobytes()
+
+
+def _caption(width, height, text, scale):
+    band = np.full((height, width, 3), BACKGROUND, dtype=np.uint8)
+    thickness = max(1, int(round(scale * 2)))
+    (text_width, text_height), _ = cv.getTextSize(text, FONT, scale, thickness)
+    origin = (max(0, (width - text_width) // 2), (height + text_height) // 2)
+    cv.putText(band, text, origin, FONT, scale, TEXT_COLOR, thickness, cv.LINE_AA)
+    return band
+
+
+def compose_comparison(original_img, updated_img, best_move, board_size=BOARD_SIZE):
+    """
+    Side-by-side BGR image of the board before and after `best_move`, each
+    scaled to `board_size` pixels square, under a title and two captions.
+    """
+    scale = board_size / 480
+    gap = max(4, board_size // 24)
+    caption_height = max(20, int(40 * scale))
+    title_height = max(24, int(50 * scale))
+
+    boards = []
+    for img, text in ((original_img, "Original Chessboard"), (updated_img, f"After Best Move: {best_move}")):
+        board = cv.resize(img, (board_size, board_size), interpolation=cv.INTER_AREA)
+        boards.append(np.vstack([_caption(board_size, caption_height, text, 0.6 * scale), board]))
+
+    spacer = np.full((boards[0].shape[0], gap, 3), BACKGROUND, dtype=np.uint8)
+    body = np.hstack([spacer, boards[0], spacer, boards[1], spacer])
+    title = _caption(body.shape[1], title_height, "Chess Analysis Result", 0.9 * scale)
+    bottom = np.full((gap, body.shape[1], 3), BACKGROUND, dtype=np.uint8)
+    return np.vstack([title, body, bottom])
+
+
+def render_comparison(original_img, updated_img, best_move, board_size=BOARD_SIZE,
+                      fmt=DEFAULT_FORMAT, quality=DEFAULT_QUALITY):
+    """compose_comparison() encoded in memory; returns the image bytes"""
+    return encode_image(compose_comparison(original_img, updated_img, best_move, board_size), fmt, quality)
+
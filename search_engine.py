@@ -0,0 +1,822 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import chess
+import chess.polyglot
+
+# Scores are centipawns from the point of view of the side to move
+PIECE_VALUES = {
+    chess.PAWN: 100, chess.KNIGHT: 300, chess.BISHOP: 300,
+    chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 0
+}
+# Bump whenever the evaluation or search changes what a position scores, so
+# results cached by older engines are no longer served
+ENGINE_VERSION = 3
+MATE_SCORE = 100000
+MATE_THRESHOLD = MATE_SCORE - 1000
+INFINITY = 10 * MATE_SCORE
+DEFAULT_DEPTH = 4
+MAX_DEPTH = 64
+# The clock is only read every this many nodes (must be a power of two)
+CHECK_INTERVAL = 1024
+# Half-width of the window around the previous iteration's score
+ASPIRATION_WINDOW = 50
+# Captures searched past the horizon are cut off after this many plies
+QUIESCENCE_DEPTH = 8
+# A capture is skipped in quiescence when even winning the piece plus this
+# margin would leave the score below alpha
+DELTA_MARGIN = 200
+# Worker processes for the root-split search; 1 searches serially in-process
+# and 0 uses every CPU core. The pool runs one search at a time.
+DEFAULT_WORKERS = int(os.environ.get('CHESS_SEARCH_WORKERS', 1))
+# Iterations shallower than this are cheaper to run serially than to split
+PARALLEL_MIN_DEPTH = 3
+
+# Piece-square bonuses from White's side, listed from a8 to h1 as the board is
+# drawn; Black uses the same tables mirrored vertically
+PIECE_SQUARE_TABLES = {
+    chess.PAWN: [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        0, 0, 0, 0, 0, 0, 0, 0,
+    ],
+    chess.KNIGHT: [
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50,
+    ],
+    chess.BISHOP: [
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 10, 10, 5, 0, -10,
+        -10, 5, 5, 10, 10, 5, 5, -10,
+        -10, 0, 10, 10, 10, 10, 0, -10,
+        -10, 10, 10, 10, 10, 10, 10, -10,
+        -10, 5, 0, 0, 0, 0, 5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20,
+    ],
+    chess.ROOK: [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, 10, 10, 10, 10, 5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        0, 0, 0, 5, 5, 0, 0, 0,
+    ],
+    chess.QUEEN: [
+        -20, -10, -10, -5, -5, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 5, 5, 5, 0, -10,
+        -5, 0, 5, 5, 5, 5, 0, -5,
+        0, 0, 5, 5, 5, 5, 0, -5,
+        -10, 5, 5, 5, 5, 5, 0, -10,
+        -10, 0, 5, 0, 0, 0, 0, -10,
+        -20, -10, -10, -5, -5, -10, -10, -20,
+    ],
+    chess.KING: [
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+        20, 20, 0, 0, 0, 0, 20, 20,
+        20, 30, 10, 0, 0, 10, 30, 20,
+    ],
+}
+
+# SQUARE_SCORES[color][piece_type][square]: material plus piece-square bonus,
+# signed from White's point of view, so a position's score is a plain sum
+SQUARE_SCORES = {
+    chess.WHITE: {
+        piece_type: [PIECE_VALUES[piece_type] + table[square ^ 56] for square in chess.SQUARES]
+        for piece_type, table in PIECE_SQUARE_TABLES.items()
+    },
+    chess.BLACK: {
+        piece_type: [-PIECE_VALUES[piece_type] - table[square] for square in chess.SQUARES]
+        for piece_type, table in PIECE_SQUARE_TABLES.items()
+    },
+}
+
+# Transposition table bound types
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+
+def search_depth(depth, time_ms=None, node_limit=None):
+    """
+    Iterative deepening cap. No depth, or a depth of 0 or less, means no cap
+    when there is a time or node budget, and DEFAULT_DEPTH otherwise.
+    """
+    if depth is None or depth <= 0:
+        return MAX_DEPTH if (time_ms or node_limit) else DEFAULT_DEPTH
+    return min(depth, MAX_DEPTH)
+
+
+def capped_limits(depth, time_ms, max_depth, max_time_ms):
+    """
+    Limits for a search requested by a client, with the server's settings as
+    ceilings. The depth is clamped to 1..max_depth, and a missing or
+    non-positive depth means max_depth. The time budget is at most
+    max_time_ms, which is also the budget when none (or 0) is given.
+    """
+    max_depth = min(max_depth or DEFAULT_DEPTH, MAX_DEPTH)
+    depth = max_depth if not depth or depth <= 0 else min(depth, max_depth)
+    if max_time_ms:
+        time_ms = max_time_ms if not time_ms or time_ms <= 0 else min(time_ms, max_time_ms)
+    return {'depth': depth, 'time_ms': time_ms or None}
+
+
+class TranspositionTable:
+    """
+    Fixed-size table of search results keyed by the polyglot Zobrist hash.
+    Each slot keeps one entry (key, depth, bound, value, best move, generation).
+    A new result replaces the stored one if it is for the same position, the
+    stored one is left over from an earlier search, or it was searched at
+    least as deep.
+    """
+
+    def __init__(self, size=1 << 18):
+        self.size = size
+        self.entries = [None] * size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def probe(self, key):
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, bound, value, move):
+        index = key % self.size
+        entry = self.entries[index]
+        if entry is not None and entry[0] != key:
+            if entry[5] == self.generation and entry[1] > depth:
+                return
+            self.replacements += 1
+        self.entries[index] = (key, depth, bound, value, move, self.generation)
+        self.stores += 1
+
+    def clear(self):
+        self.entries = [None] * self.size
+        self.hits = self.misses = self.stores = self.replacements = 0
+
+    def stats(self):
+        probes = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'replacements': self.replacements,
+            'hit_rate': self.hits / probes if probes else 0.0,
+        }
+
+
+def score_board(board):
+    """Material and piece-square score of the whole board from White's point of view"""
+    return sum(SQUARE_SCORES[piece.color][piece.piece_type][square]
+               for square, piece in board.piece_map().items())
+
+
+def evaluate(board):
+    """Full evaluation from the side to move's point of view"""
+    score = score_board(board)
+    return score if board.turn == chess.WHITE else -score
+
+
+def move_delta(board, move):
+    """
+    Change in score_board(board) that `move` makes, worked out before it is
+    pushed from the few squares it touches: the moving piece (or its
+    promotion), a captured piece, and the rook when castling.
+    """
+    piece = board.piece_at(move.from_square)
+    scores = SQUARE_SCORES[piece.color]
+    delta = scores[move.promotion or piece.piece_type][move.to_square] - scores[piece.piece_type][move.from_square]
+
+    captured = board.piece_at(move.to_square)
+    if captured is not None and captured.color != piece.color:
+        delta -= SQUARE_SCORES[captured.color][captured.piece_type][move.to_square]
+    elif piece.piece_type == chess.PAWN and move.to_square == board.ep_square:
+        captured_square = move.to_square - 8 if piece.color == chess.WHITE else move.to_square + 8
+        delta -= SQUARE_SCORES[not piece.color][chess.PAWN][captured_square]
+    elif piece.piece_type == chess.KING and abs(move.to_square - move.from_square) == 2:
+        # Castling: the rook jumps from the corner to the square the king crossed
+        rook_from = move.from_square + 3 if move.to_square > move.from_square else move.from_square - 4
+        rook_to = (move.from_square + move.to_square) // 2
+        delta += scores[chess.ROOK][rook_to] - scores[chess.ROOK][rook_from]
+    return delta
+
+
+def value_to_table(value, ply):
+    # Mate scores are stored relative to the node, not to the root
+    if value >= MATE_THRESHOLD:
+        return value + ply
+    if value <= -MATE_THRESHOLD:
+        return value - ply
+    return value
+
+
+def value_from_table(value, ply):
+    if value >= MATE_THRESHOLD:
+        return value - ply
+    if value <= -MATE_THRESHOLD:
+        return value + ply
+    return value
+
+
+class SearchAborted(Exception):
+    """Raised inside the search when the time or node budget runs out"""
+
+
+class Searcher:
+    """
+    Negamax alpha-beta search backed by a transposition table.
+    With `move_ordering` on, each node tries the hash move first, then captures
+    by MVV-LVA, then the killer moves for its ply, then quiet moves by their
+    history score; with it off only the hash move is moved to the front.
+
+    At the root the window narrows as better moves are found. `pvs` searches
+    every move after the first with a null window and only re-searches the
+    ones that beat it, and `aspiration` starts each iteration after the first
+    in a window around the previous score. `narrow_root=False` gives every
+    root move a full window, as the old find_best_move did.
+
+    With `quiescence` on, leaves are not evaluated in the middle of an exchange:
+    captures are played out (up to QUIESCENCE_DEPTH plies) until the position
+    is quiet. Those nodes are counted separately in `qnodes`.
+    """
+
+    def __init__(self, table=None, move_ordering=True, narrow_root=True, pvs=True, aspiration=True,
+                 quiescence=True, quiescence_depth=QUIESCENCE_DEPTH):
+        self.table = table if table is not None else TranspositionTable()
+        self.move_ordering = move_ordering
+        self.narrow_root = narrow_root
+        self.pvs = pvs
+        self.aspiration = aspiration
+        self.quiescence_enabled = quiescence
+        self.quiescence_depth = quiescence_depth
+        self.nodes = 0
+        self.qnodes = 0
+        self.completed_depth = 0
+        self.deadline = None
+        self.node_limit = None
+        self.killers = []
+        self.history = {}
+        # Running score_board() of the current search position and the
+        # deltas of the moves that led to it, maintained by push/pop
+        self.score = 0
+        self.deltas = []
+
+    def search(self, board, depth=None, time_ms=None, node_limit=None):
+        """
+        Iterative deepening for the side to move: search 1, 2, 3... plies until
+        `depth` is reached or the time/node budget runs out, and return the
+        (best move, score) of the last completed iteration. Depth 1 always
+        completes so there is a move to play even on a tiny budget.
+        """
+        self.start(board, time_ms, node_limit)
+        depth = search_depth(depth, time_ms, node_limit)
+
+        entry = self.table.probe(chess.polyglot.zobrist_hash(board))
+        root_moves = self.order_moves(board, list(board.legal_moves), entry[4] if entry else None, 0)
+        if not root_moves:
+            # Checkmated or stalemated: no move, and the score says which
+            return None, -MATE_SCORE if board.is_check() else 0
+        root_ply = len(board.move_stack)
+        best_move = None
+        best_value = -INFINITY
+        for current_depth in range(1, depth + 1):
+            try:
+                move, value = self.search_iteration(board, root_moves, current_depth, best_value)
+            except SearchAborted:
+                # Unwind whatever the interrupted iteration left on the board
+                while len(board.move_stack) > root_ply:
+                    self.pop(board)
+                break
+
+            best_move, best_value = move, value
+            self.completed_depth = current_depth
+            # The next iteration starts with this iteration's best move
+            if best_move is not None:
+                root_moves.remove(best_move)
+                root_moves.insert(0, best_move)
+            if abs(best_value) >= MATE_THRESHOLD:
+                break
+
+        return best_move, best_value
+
+    def start(self, board, time_ms, node_limit):
+        self.table.new_search()
+        self.nodes = 0
+        self.qnodes = 0
+        self.completed_depth = 0
+        self.killers = [[None, None] for _ in range(MAX_DEPTH + 1)]
+        self.history = {}
+        self.deadline = time.monotonic() + time_ms / 1000 if time_ms else None
+        self.node_limit = node_limit
+        # Small node budgets (a share of a parallel iteration) are checked more
+        # often so they aren't overrun by up to a whole interval
+        interval = CHECK_INTERVAL
+        while node_limit and interval > 16 and interval * 16 > node_limit:
+            interval //= 2
+        self.check_mask = interval - 1
+        self.score = score_board(board)
+        self.deltas = []
+
+    def search_move(self, board, move, depth, alpha, beta, time_ms=None, node_limit=None, index=0, line=()):
+        """
+        Score of a single root move searched to `depth` in the window
+        (alpha, beta), or None if the budget ran out first. Used by the
+        workers of ParallelSearcher, one root move at a time. As in
+        search_root, a move after the first (`index` > 0) gets a null window
+        at alpha first and a full search only if it beats alpha. `line` is the
+        move's expected continuation, used as hash moves.
+        """
+        self.start(board, time_ms, node_limit)
+        # The caller already holds the previous iteration's result, so the
+        # budget may stop this search at any point
+        self.completed_depth = depth - 1
+        self.seed_line(board, [move, *line])
+        root_ply = len(board.move_stack)
+        try:
+            self.push(board, move)
+            return self.search_child(board, depth - 1, alpha, beta, 1, index)
+        except SearchAborted:
+            return None
+        finally:
+            while len(board.move_stack) > root_ply:
+                self.pop(board)
+
+    def seed_line(self, board, line):
+        """Store the moves of `line` as hash moves of the positions they are played from, where the table has none"""
+        board = board.copy(stack=False)
+        for move in line:
+            if not board.is_legal(move):
+                break
+            key = chess.polyglot.zobrist_hash(board)
+            entry = self.table.probe(key)
+            if entry is None:
+                self.table.store(key, 0, UPPER_BOUND, 0, move)
+            elif entry[4] is None:
+                self.table.store(key, entry[1], entry[2], entry[3], move)
+            board.push(move)
+
+    def search_iteration(self, board, root_moves, depth, previous_value):
+        if not self.aspiration or depth == 1 or abs(previous_value) >= MATE_THRESHOLD:
+            return self.search_root(board, root_moves, depth, -INFINITY, INFINITY)
+
+        alpha = previous_value - ASPIRATION_WINDOW
+        beta = previous_value + ASPIRATION_WINDOW
+        move, value = self.search_root(board, root_moves, depth, alpha, beta)
+        if alpha < value < beta:
+            return move, value
+        # The score fell outside the window; search again without one
+        return self.search_root(board, root_moves, depth, -INFINITY, INFINITY)
+
+    def search_root(self, board, root_moves, depth, alpha, beta):
+        best_move = None
+        best_value = -INFINITY
+
+        for index, move in enumerate(root_moves):
+            self.push(board, move)
+            value = self.search_child(board, depth - 1, alpha, beta, 1, index)
+            self.pop(board)
+
+            if value > best_value:
+                best_value = value
+                best_move = move
+            if self.narrow_root and value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+
+        return best_move, best_value
+
+    def search_child(self, board, depth, alpha, beta, ply, index):
+        """Negated score of the position after a move, using PVS after the first move"""
+        if not self.pvs or index == 0 or beta - alpha <= 1:
+            return -self.negamax(board, depth, -beta, -alpha, ply)
+        value = -self.negamax(board, depth, -alpha - 1, -alpha, ply)
+        if alpha < value < beta:
+            value = -self.negamax(board, depth, -beta, -alpha, ply)
+        return value
+
+    def order_moves(self, board, moves, hash_move, ply):
+        if not self.move_ordering:
+            if hash_move in moves:
+                moves.remove(hash_move)
+                moves.insert(0, hash_move)
+            return moves
+
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        turn = board.turn
+
+        def sort_key(move):
+            if move == hash_move:
+                return (4, 0)
+            if board.is_capture(move):
+                return (3, self.capture_order(board, move))
+            if move.promotion:
+                return (3, move.promotion)
+            if move in killers:
+                return (2, 0)
+            return (1, self.history.get((turn, move.from_square, move.to_square), 0))
+
+        moves.sort(key=sort_key, reverse=True)
+        return moves
+
+    def record_cutoff(self, board, move, depth, ply):
+        # Quiet moves that refute a position become killers for the ply and
+        # earn history credit weighted towards deep cutoffs
+        if board.is_capture(move) or move.promotion or ply >= len(self.killers):
+            return
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        key = (board.turn, move.from_square, move.to_square)
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
+    def push(self, board, move):
+        delta = move_delta(board, move)
+        self.score += delta
+        self.deltas.append(delta)
+        board.push(move)
+
+    def pop(self, board):
+        board.pop()
+        self.score -= self.deltas.pop()
+
+    def evaluate(self, board):
+        """O(1) leaf evaluation from the running score"""
+        return self.score if board.turn == chess.WHITE else -self.score
+
+    def out_of_budget(self):
+        if self.node_limit is not None and self.nodes + self.qnodes >= self.node_limit:
+            return True
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def negamax(self, board, depth, alpha, beta, ply):
+        if depth <= 0 and self.quiescence_enabled:
+            return self.quiescence(board, alpha, beta, ply, 0)
+        self.nodes += 1
+        if self.completed_depth and self.nodes & self.check_mask == 0 and self.out_of_budget():
+            raise SearchAborted
+        if depth <= 0:
+            return self.evaluate(board)
+
+        key = chess.polyglot.zobrist_hash(board)
+        entry = self.table.probe(key)
+        hash_move = None
+        if entry is not None:
+            hash_move = entry[4]
+            if entry[1] >= depth:
+                value = value_from_table(entry[3], ply)
+                bound = entry[2]
+                if bound == EXACT:
+                    return value
+                if bound == LOWER_BOUND:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        moves = list(board.legal_moves)
+        if not moves:
+            return -MATE_SCORE + ply if board.is_check() else 0
+        if board.is_insufficient_material():
+            return 0
+        moves = self.order_moves(board, moves, hash_move, ply)
+
+        original_alpha = alpha
+        best_value = -INFINITY
+        best_move = None
+        for index, move in enumerate(moves):
+            self.push(board, move)
+            value = self.search_child(board, depth - 1, alpha, beta, ply + 1, index)
+            self.pop(board)
+
+            if value > best_value:
+                best_value = value
+                best_move = move
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                if self.move_ordering:
+                    self.record_cutoff(board, move, depth, ply)
+                break
+
+        if best_value <= original_alpha:
+            bound = UPPER_BOUND
+        elif best_value >= beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        self.table.store(key, depth, bound, value_to_table(best_value, ply), best_move)
+        return best_value
+
+    def quiescence(self, board, alpha, beta, ply, qdepth):
+        """
+        Capture-only search below the horizon. The side to move may "stand pat"
+        on the static score instead of capturing; in check every evasion is
+        searched instead, since standing still is not an option.
+        """
+        self.qnodes += 1
+        if self.completed_depth and self.qnodes & self.check_mask == 0 and self.out_of_budget():
+            raise SearchAborted
+
+        in_check = board.is_check()
+        if in_check and qdepth < self.quiescence_depth:
+            moves = list(board.legal_moves)
+            if not moves:
+                return -MATE_SCORE + ply
+            best_value = -INFINITY
+            stand_pat = None
+        else:
+            stand_pat = self.evaluate(board)
+            if stand_pat >= beta or qdepth >= self.quiescence_depth:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+            best_value = stand_pat
+            moves = list(board.generate_legal_captures())
+        moves.sort(key=lambda move: self.capture_order(board, move), reverse=True)
+
+        for move in moves:
+            if stand_pat is not None:
+                # Delta pruning: skip captures that cannot lift the score to alpha
+                gain = PIECE_VALUES[board.piece_type_at(move.to_square) or chess.PAWN]
+                if move.promotion:
+                    gain += PIECE_VALUES[move.promotion] - PIECE_VALUES[chess.PAWN]
+                if stand_pat + gain + DELTA_MARGIN <= alpha:
+                    continue
+
+            self.push(board, move)
+            value = -self.quiescence(board, -beta, -alpha, ply + 1, qdepth + 1)
+            self.pop(board)
+
+            if value > best_value:
+                best_value = value
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+        return best_value
+
+    @staticmethod
+    def capture_order(board, move):
+        # MVV-LVA; quiet check evasions sort after every capture. En passant
+        # leaves the target square empty, so a missing victim is a pawn
+        if not board.is_capture(move):
+            return -1
+        victim = board.piece_type_at(move.to_square) or chess.PAWN
+        return 10 * victim - board.piece_type_at(move.from_square)
+
+    def principal_variation(self, board, first_move, max_length=None):
+        """The expected line starting with `first_move`, read back from the table"""
+        if first_move is None:
+            return []
+        max_length = max_length or max(self.completed_depth, 1)
+        line = [first_move]
+        board = board.copy(stack=False)
+        board.push(first_move)
+        seen = {chess.polyglot.zobrist_hash(board)}
+        while len(line) < max_length:
+            entry = self.table.probe(chess.polyglot.zobrist_hash(board))
+            if entry is None or entry[4] is None or not board.is_legal(entry[4]):
+                break
+            board.push(entry[4])
+            key = chess.polyglot.zobrist_hash(board)
+            if key in seen:
+                break
+            seen.add(key)
+            line.append(entry[4])
+        return line
+
+    def stats(self):
+        return dict(self.table.stats(), nodes=self.nodes, qnodes=self.qnodes, depth=self.completed_depth)
+
+
+# Shared across requests so repeated and transposed positions stay warm
+default_table = TranspositionTable()
+
+# Root-split worker pool, created on first use and kept warm between searches.
+# Its workers share the best root score found so far through _shared_alpha,
+# so only one parallel search runs at a time; concurrent ones wait for it.
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+_shared_alpha = None
+_worker_searcher = None
+
+
+def _init_worker(shared_alpha):
+    global _shared_alpha, _worker_searcher
+    _shared_alpha = shared_alpha
+    # Each worker keeps its own table across tasks and searches
+    _worker_searcher = Searcher()
+
+
+def _search_root_move(fen, uci, depth, deadline, node_limit, line):
+    """
+    Worker task: search one root move. The first move is searched with a full
+    window; the others with a null window just below the shared alpha, and
+    again in full only if they reach it, so a move that ties the best score
+    so far still comes back with its exact value. `line` is the move's PV
+    from the previous iteration, as UCI strings. Returns (value, alpha used,
+    nodes, qnodes, PV); the value is None if the budget ran out, and the nodes
+    spent still count.
+    """
+    time_ms = None
+    if deadline is not None:
+        time_ms = (deadline - time.time()) * 1000
+        if time_ms <= 0:
+            return None, None, 0, 0, []
+    board = chess.Board(fen)
+    move = chess.Move.from_uci(uci)
+    alpha = _shared_alpha.value
+    index = 0 if alpha == -INFINITY else 1
+    value = _worker_searcher.search_move(board, move, depth, alpha - 1, INFINITY, time_ms, node_limit,
+                                         index, [chess.Move.from_uci(u) for u in line])
+    if value is None:
+        return None, alpha, _worker_searcher.nodes, _worker_searcher.qnodes, []
+    with _shared_alpha.get_lock():
+        if value > _shared_alpha.value:
+            _shared_alpha.value = value
+    # Moves that fail low still bring back their refutation for the next iteration
+    pv = _worker_searcher.principal_variation(board, move, depth)
+    return value, alpha, _worker_searcher.nodes, _worker_searcher.qnodes, [m.uci() for m in pv]
+
+
+def get_pool(workers):
+    """The shared worker pool, restarted if the worker count changes"""
+    global _pool, _pool_workers, _shared_alpha
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown()
+        # Spawned rather than forked: the caller may be a server process with
+        # threads, TensorFlow state and open SQLite connections
+        context = multiprocessing.get_context('spawn')
+        _shared_alpha = context.Value('i', -INFINITY)
+        _pool = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                    initargs=(_shared_alpha,))
+        _pool_workers = workers
+    return _pool
+
+
+class ParallelSearcher:
+    """
+    Root-split search across a process pool. The first PARALLEL_MIN_DEPTH - 1
+    iterations run serially to order the root moves. Each deeper iteration
+    searches the first move alone to set the shared alpha, then hands every
+    other root move, as a FEN and a UCI string, to the pool. Each task also
+    gets the move's line from the previous iteration, since the workers'
+    own tables haven't seen the earlier iterations. A move counts as the best
+    if it has the highest exact score, ties going to the earliest move in
+    root order, which is the move the serial search picks.
+    """
+
+    def __init__(self, workers, table=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.serial = Searcher(default_table if table is None else table)
+        self.nodes = 0
+        self.qnodes = 0
+        self.completed_depth = 0
+        self.pv = []
+        # Root move UCI -> its continuation (UCI strings) from the last iteration
+        self.lines = {}
+
+    def search(self, board, depth=None, time_ms=None, node_limit=None):
+        depth = search_depth(depth, time_ms, node_limit)
+        deadline = time.time() + time_ms / 1000 if time_ms else None
+
+        best_move, best_value = self.serial.search(board, min(depth, PARALLEL_MIN_DEPTH - 1), time_ms, node_limit)
+        self.nodes, self.qnodes = self.serial.nodes, self.serial.qnodes
+        self.completed_depth = self.serial.completed_depth
+        self.pv = self.serial.principal_variation(board, best_move)
+        if best_move is None or abs(best_value) >= MATE_THRESHOLD or self.completed_depth < min(depth, PARALLEL_MIN_DEPTH - 1):
+            return best_move, best_value
+
+        root_moves = self.serial.order_moves(board, list(board.legal_moves), best_move, 0)
+        for move in root_moves:
+            self.lines[move.uci()] = [m.uci() for m in self.serial.principal_variation(board, move)[1:]]
+        with _pool_lock:
+            pool = get_pool(self.workers)
+            for current_depth in range(self.completed_depth + 1, depth + 1):
+                remaining = None if node_limit is None else node_limit - self.nodes - self.qnodes
+                if remaining is not None and remaining <= 0:
+                    break
+                result = self.split_root(pool, board, root_moves, current_depth, deadline, remaining)
+                if result is None:
+                    break
+                best_move, best_value, self.pv = result
+                self.completed_depth = current_depth
+                root_moves.remove(best_move)
+                root_moves.insert(0, best_move)
+                if abs(best_value) >= MATE_THRESHOLD:
+                    break
+        return best_move, best_value
+
+    def split_root(self, pool, board, root_moves, depth, deadline, node_limit):
+        """
+        One parallel iteration; None if it ran out of budget. A node budget is
+        shared out: the first move may use half of it, and what is left after
+        that is split evenly across the other moves.
+        """
+        with _shared_alpha.get_lock():
+            _shared_alpha.value = -INFINITY
+        fen = board.fen()
+        budget = None if node_limit is None else max(1, node_limit // 2)
+        first = pool.submit(_search_root_move, fen, root_moves[0].uci(), depth, deadline, budget,
+                            self.lines.get(root_moves[0].uci(), []))
+        results = [first.result()]
+        self.count_nodes(results)
+        if results[0][0] is None:
+            return None
+        if len(root_moves) > 1:
+            if node_limit is not None:
+                budget = (node_limit - results[0][2] - results[0][3]) // (len(root_moves) - 1)
+                if budget <= 0:
+                    return None
+            futures = [pool.submit(_search_root_move, fen, move.uci(), depth, deadline, budget,
+                                   self.lines.get(move.uci(), []))
+                       for move in root_moves[1:]]
+            rest = [future.result() for future in futures]
+            self.count_nodes(rest)
+            results += rest
+        if any(result[0] is None for result in results):
+            return None
+        for move, (_, _, _, _, pv) in zip(root_moves, results):
+            self.lines[move.uci()] = pv[1:]
+
+        best_index = None
+        for index, (value, alpha, _, _, pv) in enumerate(results):
+            # Values below the window's alpha are only upper bounds
+            if value >= alpha and (best_index is None or value > results[best_index][0]):
+                best_index = index
+        value, _, _, _, pv = results[best_index]
+        return root_moves[best_index], value, [chess.Move.from_uci(uci) for uci in pv]
+
+    def count_nodes(self, results):
+        # Aborted tasks count too: their nodes were searched all the same
+        for _, _, nodes, qnodes, _ in results:
+            self.nodes += nodes
+            self.qnodes += qnodes
+
+    def principal_variation(self, board, first_move, max_length=None):
+        if self.pv and self.pv[0] == first_move:
+            return self.pv
+        return [first_move] if first_move is not None else []
+
+
+def best_move(board, limits=None, table=None):
+    """
+    Search `board` for the side to move (board.turn) and return a dict with the
+    best move, its score in centipawns from that side's point of view, the
+    principal variation, the depth completed, the main and quiescence node
+    counts and the time taken. `limits` may give 'depth', 'time_ms' and 'nodes'; a depth together
+    with a budget caps the iterative deepening, and with no limits the search
+    goes DEFAULT_DEPTH plies. 'workers' above 1 (or 0 for every core) splits
+    the root moves across that many processes.
+    """
+    limits = limits or {}
+    workers = limits.get('workers', DEFAULT_WORKERS)
+    if workers == 1:
+        searcher = Searcher(default_table if table is None else table)
+    else:
+        searcher = ParallelSearcher(workers, table)
+    start = time.perf_counter()
+    move, score = searcher.search(board, limits.get('depth'), limits.get('time_ms'), limits.get('nodes'))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return {
+        'move': move,
+        'score': score,
+        'pv': searcher.principal_variation(board, move),
+        'depth': searcher.completed_depth,
+        'nodes': searcher.nodes,
+        'qnodes': searcher.qnodes,
+        'time_ms': elapsed_ms,
+    }